@@ -0,0 +1,69 @@
+# Replays a recorded getUpdates batch (500 updates over 50 chats, each a command
+# that makes one slow upstream call) against a local fake Telegram server and
+# reports updates/sec for the old serial loop vs the per-chat worker pool.
+#
+#   python bench_dispatch.py [--updates 500] [--chats 50] [--upstream-ms 20] [--workers 8]
+import argparse
+import time
+
+from bot import TeleBot
+from sendqueue import Outbox
+from fakeserver import FakeServer, slow, telegram_ok
+
+
+def recorded_batch(n, chats):
+    return [{"update_id": 1000 + i,
+             "message": {"message_id": i, "chat": {"id": 1 + i % chats}, "text": f"/slow {i}"}}
+            for i in range(n)]
+
+
+def make_bot(server, workers):
+    bot = TeleBot("bench", max_workers=workers)
+    bot.base_url = server.url + "/botbench"
+    # the bench measures dispatch, not Telegram's rate limits
+    bot.outbox = Outbox(post=bot.post, global_rate=1e6, chat_rate=1e6, chat_burst=1e6, senders=workers)
+    upstream = server.url + "/upstream"
+    bot.register_command("slow", lambda arg, cid: bot.sendMessage(bot.get(upstream).json()["text"], cid))
+    return bot
+
+
+def serial(bot, updates):
+    # what TeleBot.run used to do: one update after another on the polling thread
+    for u in updates:
+        bot.messageHandler(u["message"]["text"], u["message"]["chat"]["id"])
+
+
+def pooled(bot, updates):
+    bot.handleBatch(updates)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--updates", type=int, default=500)
+    ap.add_argument("--chats", type=int, default=50)
+    ap.add_argument("--upstream-ms", type=float, default=20)
+    ap.add_argument("--workers", type=int, default=8)
+    args = ap.parse_args()
+
+    batch = recorded_batch(args.updates, args.chats)
+    server = FakeServer({
+        "/getUpdates": lambda p: (200, {"ok": True, "result": batch}),
+        "/sendMessage": telegram_ok,
+        "/upstream": slow(args.upstream_ms / 1000, {"text": "ok"}),
+    }).start()
+
+    print(f"{args.updates} updates, {args.chats} chats, {args.upstream_ms:g} ms upstream, {args.workers} workers")
+    for name, run in (("serial (before)", serial), ("worker pool (after)", pooled)):
+        bot = make_bot(server, args.workers)
+        sent = server.count("/sendMessage")
+        start = time.perf_counter()
+        updates = bot.getUpdates()["result"]
+        run(bot, updates)
+        server.wait_for("/sendMessage", sent + len(updates))
+        elapsed = time.perf_counter() - start
+        print(f"  {name:<20} {elapsed:7.2f} s  {len(updates) / elapsed:8.1f} updates/s")
+    server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# Latency of a fresh connection per call (the old module-level req.get) vs the
+# pooled keep-alive session TeleBot now uses, against a local HTTP stub.
+# --tls serves HTTPS with a throwaway self-signed cert (needs the openssl CLI),
+# which is closer to the real APIs: the cold path then pays a TLS handshake too.
+#
+#   python bench_http.py [--calls 500] [--tls]
+import argparse
+import os
+import ssl
+import subprocess
+import tempfile
+import time
+
+import requests as req
+import urllib3
+
+from bot import make_session
+from metrics import BOUNDS, Histogram
+from fakeserver import FakeServer
+
+
+def self_signed(dirname):
+    cert, key = os.path.join(dirname, "cert.pem"), os.path.join(dirname, "key.pem")
+    subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+                    "-subj", "/CN=localhost", "-keyout", key, "-out", cert],
+                   check=True, capture_output=True)
+    ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    ctx.load_cert_chain(cert, key)
+    return ctx
+
+
+def measure(get, url, calls):
+    h = Histogram()
+    for _ in range(calls):
+        start = time.perf_counter()
+        get(url, timeout=10, verify=False).json()
+        h.observe(time.perf_counter() - start)
+    return h
+
+
+def show(name, h):
+    print(f"{name}: p50 {h.quantile(0.5) * 1000:.2f} ms  p95 {h.quantile(0.95) * 1000:.2f} ms  "
+          f"p99 {h.quantile(0.99) * 1000:.2f} ms  mean {h.sum / h.count * 1000:.2f} ms")
+    peak = max(h.counts)
+    lo = 0.0
+    for i, c in enumerate(h.counts):
+        hi = BOUNDS[i] if i < len(BOUNDS) else float("inf")
+        if c:
+            print(f"  {lo * 1000:8.2f}-{hi * 1000:<8.2f} ms {'#' * max(1, round(40 * c / peak))} {c}")
+        lo = hi
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--calls", type=int, default=500)
+    ap.add_argument("--tls", action="store_true")
+    args = ap.parse_args()
+    urllib3.disable_warnings()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ctx = self_signed(tmp) if args.tls else None
+        server = FakeServer({"/stub": lambda p: (200, {"ok": True})}, ssl_context=ctx).start()
+        url = server.url + "/stub"
+        session = make_session()
+        session.get(url, verify=False)  # warm the pool once
+        print(f"{args.calls} calls to {server.url}")
+        show("cold (req.get)", measure(req.get, url, args.calls))
+        show("pooled (make_session)", measure(session.get, url, args.calls))
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
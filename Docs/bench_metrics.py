@@ -0,0 +1,70 @@
+# Overhead of the instrumentation layer: cost per Metrics.observe() and per
+# `with metrics.timer(...)`, next to an empty loop and an uninstrumented
+# perf_counter pair, plus snapshot/export cost with a realistic label count.
+#
+#   python bench_metrics.py [--iterations 200000] [--threads 4]
+import argparse
+import threading
+import time
+
+from metrics import Metrics
+
+
+def per_call(fn, n):
+    start = time.perf_counter()
+    fn(n)
+    return (time.perf_counter() - start) / n * 1e6
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--iterations", type=int, default=200000)
+    ap.add_argument("--threads", type=int, default=4)
+    args = ap.parse_args()
+    n = args.iterations
+    m = Metrics()
+
+    def empty(n):
+        for _ in range(n):
+            pass
+
+    def bare_clock(n):
+        for _ in range(n):
+            start = time.perf_counter()
+            time.perf_counter() - start
+
+    def observe(n):
+        for i in range(n):
+            m.observe("upstream", "api.example.com", 0.0123)
+
+    def timer(n):
+        for _ in range(n):
+            with m.timer("handler", "news"):
+                pass
+
+    base = per_call(empty, n)
+    print(f"{n} iterations (loop overhead {base:.3f} us subtracted)")
+    for name, fn in (("perf_counter pair", bare_clock), ("observe()", observe), ("timer()", timer)):
+        print(f"  {name:<18} {per_call(fn, n) - base:6.2f} us/call")
+
+    # lock contention: several handler threads timing at once
+    per_thread = n // args.threads
+    threads = [threading.Thread(target=timer, args=(per_thread,)) for _ in range(args.threads)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    print(f"  timer() x{args.threads} threads {elapsed / (per_thread * args.threads) * 1e6:6.2f} us/call (wall)")
+
+    for i in range(40):
+        m.observe("handler", f"cmd{i}", 0.01 * i)
+    start = time.perf_counter()
+    for _ in range(100):
+        m.prometheus()
+    print(f"  prometheus() with {len(m.hists)} series: {(time.perf_counter() - start) * 10:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
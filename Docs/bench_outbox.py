@@ -0,0 +1,84 @@
+# Drives the Outbox with Telegram's real limits against a fake sendMessage that
+# answers 429 (retry_after) to every Nth request. Every message carries its
+# per-chat sequence number; the stub checks that each chat's messages arrive in
+# order and never two at a time, and the run reports throughput, retries and
+# the outbox_wait / outbox_depth series as the Metrics export shows them.
+#
+#   python bench_outbox.py [--chats 20] [--per-chat 10] [--every 7] [--senders 8]
+import argparse
+import threading
+import time
+
+from metrics import Metrics
+from sendqueue import Outbox, BULK, INTERACTIVE
+from fakeserver import FakeServer
+
+
+class Stub:
+    # fake sendMessage: records arrival order per chat and flags overlaps
+    def __init__(self, every, retry_after):
+        self.every = every
+        self.retry_after = retry_after
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.inflight = set()
+        self.overlaps = 0
+        self.seen = {}  # cid -> sequence numbers in arrival order
+
+    def route(self, params):
+        cid, n = params["chat_id"], int(params["text"])
+        with self.lock:
+            self.requests += 1
+            throttle = self.requests % self.every == 0
+            if cid in self.inflight:
+                self.overlaps += 1
+            self.inflight.add(cid)
+        time.sleep(0.005)
+        with self.lock:
+            self.inflight.discard(cid)
+            if throttle:
+                return 429, {"ok": False, "error_code": 429, "parameters": {"retry_after": self.retry_after}}
+            self.seen.setdefault(cid, []).append(n)
+        return 200, {"ok": True, "result": {"message_id": n, "chat": {"id": cid}}}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--chats", type=int, default=20)
+    ap.add_argument("--per-chat", type=int, default=10)
+    ap.add_argument("--every", type=int, default=7)
+    ap.add_argument("--retry-after", type=int, default=1)
+    ap.add_argument("--senders", type=int, default=8)
+    args = ap.parse_args()
+
+    stub = Stub(args.every, args.retry_after)
+    server = FakeServer({"/sendMessage": stub.route}).start()
+    metrics = Metrics()
+    outbox = Outbox(senders=args.senders, max_retries=10, metrics=metrics)
+    url = server.url + "/botbench/sendMessage"
+
+    start = time.perf_counter()
+    futures = []
+    for n in range(args.per_chat):
+        for cid in range(1, args.chats + 1):
+            # reminders-style fire-and-forget bulk sends, with a few interactive replies mixed in
+            priority = INTERACTIVE if cid % 5 == 0 else BULK
+            futures.append(outbox.send(url, str(cid), priority, data={"chat_id": str(cid), "text": str(n)}))
+    for f in futures:
+        f.result()
+    elapsed = time.perf_counter() - start
+    server.stop()
+
+    total = args.chats * args.per_chat
+    out_of_order = sum(1 for seq in stub.seen.values() if seq != sorted(seq))
+    print(f"{total} messages to {args.chats} chats, 429 on every {args.every}th request, {args.senders} senders")
+    print(f"  {elapsed:.2f} s  {total / elapsed:.1f} msg/s  {stub.requests} requests  stats {outbox.stats()}")
+    print(f"  chats out of order: {out_of_order}  concurrent posts to one chat: {stub.overlaps}")
+    print("  exported:")
+    for line in metrics.prometheus().splitlines():
+        if "outbox" in line and ("quantile=\"0.50\"" in line or "_count" in line or "depth" in line):
+            print(f"    {line}")
+
+
+if __name__ == "__main__":
+    main()
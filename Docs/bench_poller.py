@@ -0,0 +1,108 @@
+# Update latency (created -> handled) through Poller vs the old fixed loop
+# (long poll, then time.sleep(1) after every reply), against a fake getUpdates
+# that long-polls like Telegram: it holds the request until updates exist or
+# the timeout runs out, and returns at most --limit per reply. Updates arrive
+# in random bursts from a producer thread.
+#
+#   python bench_poller.py [--bursts 40] [--burst-size 150] [--gap 0.25]
+import argparse
+import random
+import threading
+import time
+
+import requests as req
+
+from metrics import Histogram
+from polling import Poller
+from fakeserver import FakeServer
+
+
+class Feed:
+    # the updates Telegram is holding for the bot, with their creation times
+    def __init__(self, limit):
+        self.limit = limit
+        self.updates = []
+        self.cond = threading.Condition()
+
+    def push(self, n):
+        with self.cond:
+            first = len(self.updates) + 1
+            for i in range(n):
+                self.updates.append({"update_id": first + i, "created": time.perf_counter()})
+            self.cond.notify_all()
+
+    def route(self, params):
+        offset = int(params.get("offset") or 1)
+        timeout = float(params.get("timeout") or 0)
+        with self.cond:
+            self.cond.wait_for(lambda: len(self.updates) >= offset, timeout)
+            return 200, {"ok": True, "result": self.updates[offset - 1:offset - 1 + self.limit]}
+
+
+def produce(feed, args):
+    rng = random.Random(1)
+    for _ in range(args.bursts):
+        time.sleep(rng.uniform(0, 2 * args.gap))
+        feed.push(rng.randint(1, args.burst_size))
+
+
+def old_loop(get_updates, handle, stop):
+    offset = None
+    while not stop.is_set():
+        updates = get_updates(offset, 1)
+        for update in updates["result"]:
+            offset = update["update_id"] + 1
+            handle(update)
+        time.sleep(1)
+
+
+def poller_loop(get_updates, handle, stop):
+    poller = Poller(get_updates, handle, timeout=1)
+    while not stop.is_set():
+        poller.poll_once()
+
+
+def run(name, loop, args):
+    feed = Feed(args.limit)
+    server = FakeServer({"/getUpdates": feed.route}).start()
+    session = req.Session()
+    h = Histogram()
+    handled = [0]
+
+    def get_updates(offset, timeout):
+        return session.get(f"{server.url}/botbench/getUpdates", params={"offset": offset, "timeout": timeout},
+                           timeout=timeout + 10).json()
+
+    def handle(update):
+        h.observe(time.perf_counter() - update["created"])
+        handled[0] += 1
+
+    stop = threading.Event()
+    worker = threading.Thread(target=loop, args=(get_updates, handle, stop), daemon=True)
+    worker.start()
+    produce(feed, args)
+    while handled[0] < len(feed.updates):
+        time.sleep(0.01)
+    stop.set()
+    worker.join()
+    server.stop()
+    print(f"  {name:<22} p50 {h.quantile(0.5) * 1000:7.1f} ms  p95 {h.quantile(0.95) * 1000:7.1f} ms  "
+          f"p99 {h.quantile(0.99) * 1000:7.1f} ms  mean {h.sum / h.count * 1000:7.1f} ms  "
+          f"({server.count('/getUpdates')} polls)")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--bursts", type=int, default=40)
+    ap.add_argument("--burst-size", type=int, default=150)
+    ap.add_argument("--gap", type=float, default=0.25)
+    ap.add_argument("--limit", type=int, default=100)
+    args = ap.parse_args()
+    print(f"{args.bursts} bursts of up to {args.burst_size} updates, ~{args.gap:g} s apart, "
+          f"{args.limit} per getUpdates reply")
+    run("old loop (sleep 1 s)", old_loop, args)
+    run("Poller", poller_loop, args)
+
+
+if __name__ == "__main__":
+    main()
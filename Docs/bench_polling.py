@@ -0,0 +1,69 @@
+# Polling throughput against a fake getUpdates endpoint that serves a backlog in
+# pages of up to 100 updates (honouring offset/limit, like Telegram). Each update
+# is a command that replies once. Runs with and without the fsynced offset
+# journal, so its cost per poll is visible.
+#
+#   python bench_polling.py [--updates 5000] [--chats 200] [--limit 100]
+import argparse
+import os
+import tempfile
+import time
+
+from bot import TeleBot
+from sendqueue import Outbox
+from fakeserver import FakeServer, telegram_ok
+
+
+def backlog(n, chats, first=1):
+    return [{"update_id": first + i,
+             "message": {"message_id": i, "chat": {"id": 1 + i % chats}, "text": "/ping"}}
+            for i in range(n)]
+
+
+def pages(updates):
+    def route(params):
+        offset = int(params.get("offset") or 0)
+        limit = int(params.get("limit") or 100)
+        start = max(0, offset - updates[0]["update_id"])
+        return 200, {"ok": True, "result": updates[start:start + limit]}
+    return route
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--updates", type=int, default=5000)
+    ap.add_argument("--chats", type=int, default=200)
+    ap.add_argument("--limit", type=int, default=100)
+    args = ap.parse_args()
+
+    updates = backlog(args.updates, args.chats)
+    server = FakeServer({"/getUpdates": pages(updates), "/sendMessage": telegram_ok}).start()
+    print(f"{args.updates} updates in pages of {args.limit}, {args.chats} chats")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, offset_file in (("no journal", None), ("fsynced journal", os.path.join(tmp, "offset.txt"))):
+            bot = TeleBot("bench", offset_file=offset_file, limit=args.limit)
+            bot.base_url = server.url + "/botbench"
+            bot.outbox = Outbox(post=bot.post, global_rate=1e6, chat_rate=1e6, chat_burst=1e6, senders=8)
+            bot.register_command("ping", lambda arg, cid, bot=bot: bot.sendMessage("pong", cid))
+            last = updates[-1]["update_id"]
+            polls = 0
+            start = time.perf_counter()
+            # TeleBot.run's loop, minus the reminder and metrics tasks
+            while (bot.offset or 0) <= last:
+                bot.poll_once()
+                polls += 1
+            with bot.pending_cond:
+                bot.pending_cond.wait_for(lambda: not bot.pending)
+            bot.save_offset()
+            elapsed = time.perf_counter() - start
+            print(f"  {name:<20} {elapsed:6.2f} s  {args.updates / elapsed:8.1f} updates/s  "
+                  f"{polls} polls, offset {bot.offset}")
+            if offset_file:
+                with open(offset_file) as f:
+                    print(f"  journal on disk: {f.read()}")
+    server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# Schedules 100k reminders from 8 threads while reminder_loop runs, then reports
+# firing jitter (fired - due) and the CPU the process used while they fired.
+# Sends are recorded instead of going to Telegram; persistence is on.
+#
+#   python bench_reminders.py [--reminders 100000] [--spread 10] [--threads 8]
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from bot import TeleBot
+
+
+class Recorder:
+    # stands in for the Outbox: remembers when each reminder went out
+    def __init__(self):
+        self.fired = []
+
+    def send(self, url, cid, priority=0, **kw):
+        self.fired.append((time.time(), cid))
+
+
+def pct(values, q):
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+async def run(args, path):
+    bot = TeleBot("bench", reminders_file=path)
+    bot.outbox = Recorder()
+    asyncio.create_task(bot.reminder_loop())
+    await asyncio.sleep(0)
+
+    start = time.time() + 1
+    dues = [start + random.random() * args.spread for _ in range(args.reminders)]
+    due_of = {}
+
+    def add(chunk):
+        for i in chunk:
+            due_of[i] = dues[i]
+            bot.add_reminder(dues[i], i, "bench")
+
+    chunks = [range(t, args.reminders, args.threads) for t in range(args.threads)]
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(args.threads) as pool:
+        await asyncio.gather(*(asyncio.get_running_loop().run_in_executor(pool, add, c) for c in chunks))
+    added = time.perf_counter() - t0
+
+    cpu0, wall0 = time.process_time(), time.perf_counter()
+    while len(bot.outbox.fired) < args.reminders:
+        await asyncio.sleep(0.05)
+    cpu, wall = time.process_time() - cpu0, time.perf_counter() - wall0
+
+    jitter = sorted((t - due_of[cid]) * 1000 for t, cid in bot.outbox.fired)
+    print(f"{args.reminders} reminders over {args.spread:g} s, added from {args.threads} threads "
+          f"in {added:.2f} s ({args.reminders / added:,.0f}/s)")
+    print(f"jitter ms: p50 {pct(jitter, 0.5):.2f}  p99 {pct(jitter, 0.99):.2f}  max {jitter[-1]:.2f}  "
+          f"min {jitter[0]:.2f}")
+    print(f"cpu while firing: {cpu:.2f} s over {wall:.2f} s wall ({100 * cpu / wall:.1f}%)")
+    await asyncio.sleep(1.5)
+    bot.flush_reminders()
+    print(f"reminders file after drain: {os.path.getsize(path)} bytes")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--reminders", type=int, default=100000)
+    ap.add_argument("--spread", type=float, default=10)
+    ap.add_argument("--threads", type=int, default=8)
+    args = ap.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(run(args, os.path.join(tmp, "reminders.json")))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+# Streams /ask answers from a fake OpenRouter SSE endpoint into a fake Telegram
+# that enforces the 4096 UTF-16 unit limit the way the real API does (emoji count
+# as two). One chat per scenario: a long emoji-heavy answer that has to roll
+# over several times, one that fails mid-stream with an error event, and one
+# whose rollover sendMessage is refused (ok: false). Reports sends, edits,
+# over-limit rejects, time to the first visible text and whether every message
+# put together gives back the streamed answer.
+#
+#   python bench_stream.py [--units 20000] [--chunk 40] [--delay 0.002] [--interval 0.05]
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from botv6 import TeleBot, TG_LIMIT
+from sendqueue import Outbox
+from fakeserver import FakeServer
+
+LINE = "Stream 🚀 test, ünïcode and 👩‍💻 emoji 🎉\n"
+
+
+def answer(units):
+    # LINE repeated until it is at least `units` UTF-16 units long
+    per = len(LINE.encode("utf-16-le")) // 2
+    return LINE * (units // per + 1)
+
+
+class SSE:
+    # fake OpenRouter: the question picks the scenario, the answer goes out in
+    # `chunk`-character deltas with keep-alives and processing comments in between
+    def __init__(self, text, chunk, delay):
+        self.text = text
+        self.chunk = chunk
+        self.delay = delay
+        sse = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                sse.stream(self, body["messages"][-1]["content"])
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/api/v1/chat/completions"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def stream(self, h, scenario):
+        try:
+            self.send_events(h, scenario)
+        except ConnectionError:
+            pass  # the bot stopped reading (refused rollover)
+
+    def send_events(self, h, scenario):
+        h.send_response(200)
+        h.send_header("Content-Type", "text/event-stream")
+        h.send_header("Connection", "close")
+        h.end_headers()
+        h.wfile.write(b": OPENROUTER PROCESSING\n\n")
+        text = self.text[:len(self.text) // 3] if scenario == "error" else self.text
+        for i in range(0, len(text), self.chunk):
+            event = {"choices": [{"delta": {"content": text[i:i + self.chunk]}}]}
+            h.wfile.write(f"data: {json.dumps(event)}\n\n".encode())
+            if i % (self.chunk * 20) == 0:
+                h.wfile.write(b"\n")
+            h.wfile.flush()
+            time.sleep(self.delay)
+        if scenario == "error":
+            h.wfile.write(b'data: {"error": {"message": "Provider returned error"}}\n\n')
+        else:
+            h.wfile.write(b"data: [DONE]\n\n")
+        h.wfile.flush()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class Telegram:
+    # fake sendMessage/editMessageText keeping every message's current text
+    def __init__(self, refuse_rollover):
+        self.refuse_rollover = refuse_rollover  # chat ids whose second sendMessage is refused
+        self.lock = threading.Lock()
+        self.messages = {}  # cid -> [text, ...], message_id is the index
+        self.first_text = {}  # cid -> time the first answer text was shown
+        self.sends = self.edits = self.too_long = self.refused = 0
+
+    def check(self, text):
+        if len(text.encode("utf-16-le")) // 2 > TG_LIMIT:
+            self.too_long += 1
+            return 400, {"ok": False, "error_code": 400, "description": "Bad Request: message is too long"}
+
+    def send(self, params):
+        cid, text = params["chat_id"], params["text"]
+        with self.lock:
+            self.sends += 1
+            bad = self.check(text)
+            if bad:
+                return bad
+            msgs = self.messages.setdefault(cid, [])
+            if msgs and cid in self.refuse_rollover:
+                self.refused += 1
+                return 403, {"ok": False, "error_code": 403, "description": "Forbidden: bot was blocked by the user"}
+            msgs.append(text)
+            return 200, {"ok": True, "result": {"message_id": len(msgs) - 1, "chat": {"id": cid}}}
+
+    def edit(self, params):
+        cid, mid, text = params["chat_id"], params["message_id"], params["text"]
+        with self.lock:
+            self.edits += 1
+            bad = self.check(text)
+            if bad:
+                return bad
+            if text != "🧠 " and cid not in self.first_text:
+                self.first_text[cid] = time.perf_counter()
+            self.messages[cid][mid] = text
+            return 200, {"ok": True, "result": {"message_id": mid, "chat": {"id": cid}}}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--units", type=int, default=20000)
+    ap.add_argument("--chunk", type=int, default=40)
+    ap.add_argument("--delay", type=float, default=0.002)
+    ap.add_argument("--interval", type=float, default=0.05)
+    args = ap.parse_args()
+
+    text = answer(args.units)
+    sse = SSE(text, args.chunk, args.delay)
+    scenarios = {1: "long", 2: "error", 3: "refused"}
+    tg = Telegram(refuse_rollover={3})
+    telegram = FakeServer({"/sendMessage": tg.send, "/editMessageText": tg.edit}).start()
+
+    bot = TeleBot("bench", "bench-key")
+    bot.base_url = telegram.url + "/botbench"
+    bot.or_url = sse.url
+    bot.outbox = Outbox(global_rate=1e6, chat_rate=1e6, chat_burst=1e6, senders=8)
+
+    errors = {}
+
+    def ask(cid):
+        try:
+            bot.streamAnswer(scenarios[cid], cid, interval=args.interval)
+        except Exception as e:
+            errors[cid] = repr(e)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=ask, args=(cid,)) for cid in scenarios]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    sse.stop()
+    telegram.stop()
+
+    units = len(text.encode("utf-16-le")) // 2
+    print(f"answer of {len(text)} chars / {units} UTF-16 units in {args.chunk}-char deltas, "
+          f"edit interval {args.interval}s")
+    print(f"  {elapsed:.2f} s  {tg.sends} sends  {tg.edits} edits  "
+          f"{tg.too_long} rejected as too long  {tg.refused} refused")
+    for cid, name in scenarios.items():
+        msgs = tg.messages.get(cid, [])
+        shown = "".join(msgs).removeprefix("🧠 ").replace("\n", "")
+        first = tg.first_text.get(cid)
+        ttft = f"{(first - start) * 1000:.0f} ms" if first else "-"
+        if name == "long":
+            intact = shown == text.replace("\n", "")
+        elif name == "error":
+            intact = "⚠️ OpenRouter error: Provider returned error" in msgs[-1]
+        else:
+            intact = len(msgs) == 1
+        print(f"  {name:8} messages {len(msgs)}  first text after {ttft}  "
+              f"{'ok' if intact else 'MISMATCH'}  {errors.get(cid, '')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# Replays recorded updates against WebhookServer the way Telegram delivers them:
+# several keep-alive connections POSTing JSON with the secret header. Each update
+# is a /ping that TeleBot answers through a fake Telegram. Reports POST
+# round-trip latency, the server's ingest stats and end-to-end time until every
+# reply was sent. A few bad requests (wrong or non-ASCII secret, oversized body)
+# are mixed in and must come back 403/413.
+#
+#   python bench_webhook.py [--updates 5000] [--chats 200] [--connections 8]
+import argparse
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests as req
+
+from bot import TeleBot
+from metrics import Histogram
+from sendqueue import Outbox
+from webhook import WebhookServer
+from fakeserver import FakeServer, telegram_ok
+
+SECRET = "bench-secret"
+
+
+def recorded(n, chats):
+    return [{"update_id": 1 + i,
+             "message": {"message_id": i, "chat": {"id": 1 + i % chats}, "text": "/ping"}}
+            for i in range(n)]
+
+
+def start_server(webhook):
+    # the webhook runs on its own loop thread, like run_webhook's asyncio.run
+    loop = asyncio.new_event_loop()
+    ready = threading.Event()
+
+    async def main():
+        server = await webhook.start()
+        webhook.port = server.sockets[0].getsockname()[1]
+        ready.set()
+        await server.serve_forever()
+
+    threading.Thread(target=loop.run_until_complete, args=(main(),), daemon=True).start()
+    ready.wait()
+    return f"http://127.0.0.1:{webhook.port}{webhook.path}"
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--updates", type=int, default=5000)
+    ap.add_argument("--chats", type=int, default=200)
+    ap.add_argument("--connections", type=int, default=8)
+    args = ap.parse_args()
+
+    telegram = FakeServer({"/sendMessage": telegram_ok}).start()
+    bot = TeleBot("bench")
+    bot.base_url = telegram.url + "/botbench"
+    bot.outbox = Outbox(post=bot.post, global_rate=1e6, chat_rate=1e6, chat_burst=1e6, senders=8)
+    bot.register_command("ping", lambda arg, cid: bot.sendMessage("pong", cid))
+    webhook = WebhookServer(bot.handleUpdate, SECRET, host="127.0.0.1", port=0, metrics=bot.metrics)
+    url = start_server(webhook)
+
+    bad = [({"X-Telegram-Bot-Api-Secret-Token": "wrong"}, b"{}", 403),
+           ({"X-Telegram-Bot-Api-Secret-Token": "sécret".encode("latin-1")}, b"{}", 403),
+           ({"X-Telegram-Bot-Api-Secret-Token": SECRET}, b" " * (webhook.max_body + 1), 413)]
+    for headers, body, want in bad:
+        status = req.post(url, data=body, headers=headers, timeout=10).status_code
+        print(f"  bad request -> {status} (want {want})")
+
+    updates = recorded(args.updates, args.chats)
+    chunks = [updates[i::args.connections] for i in range(args.connections)]
+    post_times = Histogram()
+    lock = threading.Lock()
+
+    def deliver(chunk):
+        session = req.Session()
+        headers = {"X-Telegram-Bot-Api-Secret-Token": SECRET, "Content-Type": "application/json"}
+        for u in chunk:
+            start = time.perf_counter()
+            session.post(url, data=json.dumps(u), headers=headers, timeout=10).raise_for_status()
+            with lock:
+                post_times.observe(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.connections) as pool:
+        list(pool.map(deliver, chunks))
+    posted = time.perf_counter() - start
+    telegram.wait_for("/sendMessage", args.updates)
+    done = time.perf_counter() - start
+
+    print(f"{args.updates} updates over {args.connections} connections, {args.chats} chats")
+    print(f"  POST round trip: p50 {post_times.quantile(0.5) * 1000:.2f} ms  "
+          f"p99 {post_times.quantile(0.99) * 1000:.2f} ms  ({args.updates / posted:.0f} updates/s accepted)")
+    print(f"  ingest stats: {webhook.stats()}")
+    print(f"  all replies sent after {done:.2f} s ({args.updates / done:.0f} updates/s end to end)")
+    telegram.stop()
+
+
+if __name__ == "__main__":
+    main()
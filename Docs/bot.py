@@ -2,90 +2,288 @@ import requests as req
 import asyncio
 import time
 import hashlib
+import heapq
+import itertools
+import json
+import os
+import random
+import sqlite3
+import functools
+import threading
+from collections import deque, OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from requests.adapters import HTTPAdapter
+from webhook import WebhookServer, set_webhook
+from sendqueue import Outbox, BULK
+from metrics import Metrics
+from urllib.parse import urlsplit
+
+# ----------------- HTTP -----------------
+def make_session(pool_connections=10, pool_maxsize=20):
+    # one keep-alive pool per host, shared by every helper
+    s = req.Session()
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+    s.mount("http://", adapter)
+    s.mount("https://", adapter)
+    return s
+
+# ----------------- CACHE -----------------
+# seconds per endpoint, None = never expires
+CACHE_TTLS = {
+    "news": 300,
+    "nasa": 86400,
+    "worldbank": 86400,
+    "country": 86400,
+    "pokemon": None,
+    "dict": None,
+    "poem": 86400,
+}
+
+class ResponseCache:
+    def __init__(self, maxsize=1024, db_path=None, purge_every=3600):
+        self.maxsize = maxsize
+        self.items = OrderedDict()  # key -> (expires_at, value)
+        self.lock = threading.Lock()
+        self.hits = {}
+        self.misses = {}
+        self.purge_every = purge_every
+        self.next_purge = 0
+        self.db = None
+        if db_path:
+            self.db = sqlite3.connect(db_path, check_same_thread=False)
+            self.db.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, expires REAL, value TEXT)")
+            self.purge(time.time())
+
+    def remember(self, key, entry):
+        # caller holds the lock; disk rows count against maxsize like fresh ones
+        self.items[key] = entry
+        self.items.move_to_end(key)
+        while len(self.items) > self.maxsize:
+            self.items.popitem(last=False)
+
+    def purge(self, now):
+        # caller holds the lock (or is __init__)
+        self.db.execute("DELETE FROM cache WHERE expires IS NOT NULL AND expires <= ?", (now,))
+        self.db.commit()
+        self.next_purge = now + self.purge_every
+
+    def get(self, endpoint, key):
+        now = time.time()
+        with self.lock:
+            entry = self.items.get(key)
+            if entry is None and self.db:
+                row = self.db.execute("SELECT expires, value FROM cache WHERE key = ?", (key,)).fetchone()
+                if row:
+                    entry = (row[0], json.loads(row[1]))
+            if entry is not None and (entry[0] is None or entry[0] > now):
+                self.remember(key, entry)
+                self.hits[endpoint] = self.hits.get(endpoint, 0) + 1
+                return True, entry[1]
+            if entry is not None:
+                self.items.pop(key, None)
+                if self.db:
+                    self.db.execute("DELETE FROM cache WHERE key = ?", (key,))
+                    self.db.commit()
+            self.misses[endpoint] = self.misses.get(endpoint, 0) + 1
+            return False, None
+
+    def set(self, key, value, ttl):
+        now = time.time()
+        expires = None if ttl is None else now + ttl
+        with self.lock:
+            self.remember(key, (expires, value))
+            if self.db:
+                self.db.execute("INSERT OR REPLACE INTO cache VALUES (?, ?, ?)", (key, expires, json.dumps(value)))
+                self.db.commit()
+                if now >= self.next_purge:
+                    self.purge(now)
+
+    def stats(self):
+        with self.lock:
+            return {e: {"hits": self.hits.get(e, 0), "misses": self.misses.get(e, 0)}
+                    for e in set(self.hits) | set(self.misses)}
+
+def cached(endpoint):
+    def wrap(fn):
+        @functools.wraps(fn)
+        def inner(self, *args):
+            key = endpoint + ":" + "|".join(str(a).lower() for a in args)
+            hit, value = self.cache.get(endpoint, key)
+            if hit:
+                return value
+            # fn raises on an error reply (see get_json), so only good payloads are stored
+            value = fn(self, *args)
+            self.cache.set(key, value, CACHE_TTLS.get(endpoint))
+            return value
+        return inner
+    return wrap
+
+# ----------------- COMMAND REGISTRY -----------------
+def command(name, default_arg=None, aliases=()):
+    # tags a TeleBot method; register_builtin_commands picks it up
+    def wrap(fn):
+        fn.command_spec = (name, default_arg, aliases)
+        return fn
+    return wrap
 
 class TeleBot:
-    def __init__(self, token):
+    def __init__(self, token, max_workers=8, pool_maxsize=20, timeout=10, cache_db=None,
+                 reminders_file=None, username=None, offset_file=None, limit=100,
+                 allowed_updates=("message",), metrics_port=None, metrics_file=None, max_pending=1000):
         self.token = token
+        self.username = username
+        self.commands = {}
+        self.register_builtin_commands()
         self.base_url = f"https://api.telegram.org/bot{token}"
-        self.offset = None
+        self.offset_file = offset_file
+        # update_id -> update, fetched but not yet handled; journalled with the offset
+        self.pending = {}
+        self.pending_cond = threading.Condition()
+        self.max_pending = max_pending
+        self.journal_dirty = False
+        self.poll_failures = 0
+        self.offset = self.load_offset()
+        self.limit = limit
+        self.allowed_updates = list(allowed_updates) if allowed_updates else None
+        # min-heap of (due, seq, cid, msg)
         self.reminders = []
+        self.reminder_seq = itertools.count()
+        self.reminder_lock = threading.Lock()
+        self.reminder_wake = None
+        self.loop = None
+        self.reminders_file = reminders_file
+        self.reminders_dirty = threading.Event()
+        self.load_reminders()
+        if reminders_file:
+            threading.Thread(target=self.reminder_writer, daemon=True).start()
+        # updates run on a bounded pool, one queue per chat keeps replies in order
+        self.pool = ThreadPoolExecutor(max_workers=max_workers)
+        self.chat_queues = {}
+        self.chat_lock = threading.Lock()
+        # separate pool for fan-out so handlers never wait on their own pool
+        self.io_pool = ThreadPoolExecutor(max_workers=max_workers * 2)
+        self.deadline = 8
+        self.local = threading.local()  # .until = fan-out deadline of the call on this thread
+        # every thread that can hold a connection at once: handlers, fan-out,
+        # outbox senders and the poller; a smaller pool makes urllib3 drop sockets
+        senders = max_workers
+        callers = max_workers + max_workers * 2 + senders + 1
+        self.http = make_session(pool_maxsize=max(pool_maxsize, callers))
+        self.timeout = timeout
+        self.cache = ResponseCache(db_path=cache_db)
+        self.metrics = Metrics()
+        self.outbox = Outbox(post=self.post, senders=senders, metrics=self.metrics)
+        self.metrics_port = metrics_port
+        self.metrics_file = metrics_file
+
+    # upstream calls are timed per host, Telegram calls per API method
+    def get(self, url, **kw):
+        kw.setdefault("timeout", self.timeout)
+        until = getattr(self.local, "until", None)
+        if until:
+            # inside fanout: don't outlive the deadline and keep an io_pool thread busy
+            kw["timeout"] = max(0.1, min(kw["timeout"], until - time.monotonic()))
+        with self.metrics.timer("upstream", urlsplit(url).hostname):
+            return self.http.get(url, **kw)
+
+    def get_json(self, url, **kw):
+        # used by @cached endpoints: an error status (429, 5xx, ...) raises instead of
+        # handing back an error payload that would then sit in the cache for the TTL
+        r = self.get(url, **kw)
+        r.raise_for_status()
+        return r.json()
+
+    def post(self, url, **kw):
+        kw.setdefault("timeout", self.timeout)
+        with self.metrics.timer("telegram_send", url.rsplit("/", 1)[-1]):
+            return self.http.post(url, **kw)
 
     # ----------------- TELEGRAM -----------------
     def getUpdates(self):
-        payload = {"offset": self.offset, "timeout": 30}
-        return req.get(f"{self.base_url}/getUpdates", params=payload).json()
+        payload = {"offset": self.offset, "timeout": 30, "limit": self.limit}
+        if self.allowed_updates:
+            payload["allowed_updates"] = json.dumps(self.allowed_updates)
+        with self.metrics.timer("poll_wait"):
+            return self.http.get(f"{self.base_url}/getUpdates", params=payload, timeout=payload["timeout"] + 10).json()
 
     def sendMessage(self, text, cid):
         payload = {"chat_id": cid, "text": text}
-        return req.post(f"{self.base_url}/sendMessage", data=payload).json()
+        return self.outbox.send(f"{self.base_url}/sendMessage", cid, data=payload).result()
 
     def sendPhoto(self, cid, url):
         payload = {"chat_id": cid, "photo": url}
-        return req.post(f"{self.base_url}/sendPhoto", data=payload).json()
+        return self.outbox.send(f"{self.base_url}/sendPhoto", cid, data=payload).result()
 
     # ----------------- APIs -----------------
     def get_movie(self, name):
-        return req.get(f"http://www.omdbapi.com/?apikey=27ec289b&t={name}").json()
+        return self.get(f"http://www.omdbapi.com/?apikey=27ec289b&t={name}").json()
 
     def get_weather(self, city):
-        return req.get(f"http://api.openweathermap.org/data/2.5/weather?q={city}&appid=bf81ab202a06c347cd9c42cc6a5d3c5f&units=metric").json()
+        return self.get(f"http://api.openweathermap.org/data/2.5/weather?q={city}&appid=bf81ab202a06c347cd9c42cc6a5d3c5f&units=metric").json()
 
+    @cached("news")
     def get_news(self):
-        return req.get("https://newsapi.org/v2/top-headlines?country=us&apiKey=59f47ed5549144249cd435bbf6b80bee").json()
+        return self.get_json("https://newsapi.org/v2/top-headlines?country=us&apiKey=59f47ed5549144249cd435bbf6b80bee")
 
     def get_waifu(self, tag="maid"):
-        return req.get(f"https://api.waifu.im/search?included_tags={tag}").json()["images"][0]["url"]
+        return self.get(f"https://api.waifu.im/search?included_tags={tag}").json()["images"][0]["url"]
 
     def get_pickup(self):
-        return req.get("https://rizzapi.vercel.app/random").json()["text"]
+        return self.get("https://rizzapi.vercel.app/random").json()["text"]
 
     def get_pickup2(self):
-        return req.get("https://vinuxd.vercel.app/api/pickup").json()["pickup"]
+        return self.get("https://vinuxd.vercel.app/api/pickup").json()["pickup"]
 
     def get_dog(self):
-        return req.get("https://dog.ceo/api/breeds/image/random").json()["message"]
+        return self.get("https://dog.ceo/api/breeds/image/random").json()["message"]
 
     def get_cat(self):
-        return req.get("https://api.thecatapi.com/v1/images/search").json()[0]["url"]
+        return self.get("https://api.thecatapi.com/v1/images/search").json()[0]["url"]
 
     def get_joke(self):
-        res = req.get("https://v2.jokeapi.dev/joke/Any").json()
+        res = self.get("https://v2.jokeapi.dev/joke/Any").json()
         if res["type"] == "single":
             return res["joke"]
         return f"{res['setup']}\n{res['delivery']}"
 
     def get_bored(self):
-        return req.get("https://bored-api.appbrewery.com/random").json()["activity"]
+        return self.get("https://bored-api.appbrewery.com/random").json()["activity"]
 
     def get_meal(self, name="Arrabiata"):
-        return req.get(f"https://www.themealdb.com/api/json/v1/1/search.php?s={name}").json()["meals"][0]
+        return self.get(f"https://www.themealdb.com/api/json/v1/1/search.php?s={name}").json()["meals"][0]
 
     def get_cocktail(self, name="margarita"):
-        return req.get(f"https://www.thecocktaildb.com/api/json/v1/1/search.php?s={name}").json()["drinks"][0]
+        return self.get(f"https://www.thecocktaildb.com/api/json/v1/1/search.php?s={name}").json()["drinks"][0]
 
+    @cached("poem")
     def get_poem(self, author="Shakespeare"):
-        return req.get(f"https://poetrydb.org/author/{author}").json()[0]["title"]
+        return self.get_json(f"https://poetrydb.org/author/{author}")[0]["title"]
 
     def get_art(self):
-        return req.get("https://api.artic.edu/api/v1/artworks").json()["data"][0]["title"]
+        return self.get("https://api.artic.edu/api/v1/artworks").json()["data"][0]["title"]
 
+    @cached("country")
     def get_country(self, name="india"):
-        return req.get(f"https://restcountries.com/v3.1/name/{name}").json()[0]
+        return self.get_json(f"https://restcountries.com/v3.1/name/{name}")[0]
 
+    @cached("pokemon")
     def get_pokemon(self, pid=1):
-        return req.get(f"https://pokeapi.co/api/v2/pokemon/{pid}").json()
+        return self.get_json(f"https://pokeapi.co/api/v2/pokemon/{pid}")
 
+    @cached("dict")
     def get_dictionary(self, word="hello"):
-        return req.get(f"https://api.dictionaryapi.dev/api/v2/entries/en/{word}").json()[0]
+        return self.get_json(f"https://api.dictionaryapi.dev/api/v2/entries/en/{word}")[0]
 
     def get_qr(self, text="HelloWorld"):
         return f"https://quickchart.io/qr?text={text}"
 
+    @cached("nasa")
     def get_nasa_apod(self):
-        return req.get("https://api.nasa.gov/planetary/apod?api_key=7IWO5Uciaajgu0E7yVMgzDSqLt2HFHVb8Q32eSYx").json()
+        return self.get_json("https://api.nasa.gov/planetary/apod?api_key=7IWO5Uciaajgu0E7yVMgzDSqLt2HFHVb8Q32eSYx")
 
+    @cached("worldbank")
     def get_worldbank(self, country="IN"):
-        return req.get(f"https://api.worldbank.org/v2/country/{country}?format=json").json()[1][0]
+        return self.get_json(f"https://api.worldbank.org/v2/country/{country}?format=json")[1][0]
 
     def get_marvel(self, character="iron man"):
         public = "fc018336a9bc8036a0037f19a1fdca5c"
@@ -93,139 +291,400 @@ class TeleBot:
         ts = "1"
         hash_md5 = hashlib.md5((ts + private + public).encode()).hexdigest()
         url = f"http://gateway.marvel.com/v1/public/characters?name={character}&ts={ts}&apikey={public}&hash={hash_md5}"
-        return req.get(url).json()["data"]["results"][0]
+        return self.get(url).json()["data"]["results"][0]
+
+    # ----------------- FAN-OUT -----------------
+    def run_until(self, call, until):
+        self.local.until = until
+        try:
+            return call()
+        finally:
+            self.local.until = None
+
+    def fanout(self, *calls, deadline=None):
+        # run independent calls at once; failed or late ones come back as None.
+        # Upstream gets inside a call inherit the deadline as their timeout, so a
+        # late call gives its thread back shortly after the deadline passes.
+        deadline = deadline or self.deadline
+        until = time.monotonic() + deadline
+        futures = [self.io_pool.submit(self.run_until, c, until) for c in calls]
+        wait(futures, timeout=deadline)
+        results = []
+        for f in futures:
+            if not f.done():
+                f.cancel()
+                results.append(None)
+            elif f.exception():
+                print(f"Fan-out call failed: {f.exception()}")
+                results.append(None)
+            else:
+                results.append(f.result())
+        return results
+
+    def within(self, call, deadline=None):
+        # a single upstream call under the fan-out deadline; None if it failed or was late
+        return self.fanout(call, deadline=deadline)[0]
+
+    # ----------------- COMMANDS -----------------
+    def register_command(self, name, handler, default_arg=None, aliases=()):
+        for n in (name, *aliases):
+            self.commands[n.lower()] = (handler, default_arg)
+
+    def register_builtin_commands(self):
+        for attr in dir(type(self)):
+            fn = getattr(type(self), attr)
+            spec = getattr(fn, "command_spec", None)
+            if spec:
+                name, default_arg, aliases = spec
+                self.register_command(name, getattr(self, attr), default_arg, aliases)
+
+    @command("movie", "Inception")
+    def cmd_movie(self, name, cid):
+        d = self.get_movie(name)
+        return self.sendMessage(f"🎬 {d.get('Title')} ({d.get('Year')})\n{d.get('Plot')}", cid)
+
+    @command("weather", "London")
+    def cmd_weather(self, city, cid):
+        d = self.get_weather(city)
+        return self.sendMessage(f"🌤 {city}: {d['main']['temp']}°C, {d['weather'][0]['description']}", cid)
+
+    @command("news")
+    def cmd_news(self, arg, cid):
+        news = self.within(self.get_news)
+        if not news:
+            return self.sendMessage("📰 News is slow right now, try again soon.", cid)
+        arts = news["articles"][:3]
+        msg = "\n\n".join([f"📰 {a['title']}\n{a['url']}" for a in arts])
+        return self.sendMessage(msg, cid)
+
+    @command("waifu", "maid")
+    def cmd_waifu(self, tag, cid):
+        return self.sendPhoto(cid, self.get_waifu(tag))
+
+    @command("pickup")
+    def cmd_pickup(self, arg, cid):
+        return self.sendMessage(self.get_pickup(), cid)
+
+    @command("pickup2")
+    def cmd_pickup2(self, arg, cid):
+        return self.sendMessage(self.get_pickup2(), cid)
+
+    @command("dog")
+    def cmd_dog(self, arg, cid):
+        return self.sendPhoto(cid, self.get_dog())
+
+    @command("cat")
+    def cmd_cat(self, arg, cid):
+        return self.sendPhoto(cid, self.get_cat())
+
+    @command("joke")
+    def cmd_joke(self, arg, cid):
+        return self.sendMessage(self.get_joke(), cid)
+
+    @command("bored")
+    def cmd_bored(self, arg, cid):
+        return self.sendMessage(self.get_bored(), cid)
+
+    @command("meal")
+    def cmd_meal(self, arg, cid):
+        meal = self.get_meal()
+        return self.sendMessage(f"🍽 {meal['strMeal']}\n{meal['strInstructions']}", cid)
+
+    @command("cocktail")
+    def cmd_cocktail(self, arg, cid):
+        drink = self.get_cocktail()
+        return self.sendMessage(f"🍹 {drink['strDrink']}\n{drink['strInstructions']}", cid)
+
+    @command("poem")
+    def cmd_poem(self, arg, cid):
+        return self.sendMessage(f"📜 Poem: {self.get_poem()}", cid)
+
+    @command("art")
+    def cmd_art(self, arg, cid):
+        return self.sendMessage(f"🎨 Artwork: {self.get_art()}", cid)
+
+    @command("country", "India")
+    def cmd_country(self, name, cid):
+        c = self.get_country(name)
+        return self.sendMessage(f"🌍 {c['name']['common']} - Capital: {c['capital'][0]}", cid)
+
+    @command("pokemon", "1")
+    def cmd_pokemon(self, pid, cid):
+        p = self.get_pokemon(pid)
+        return self.sendMessage(f"⚡ {p['name'].title()} - Base XP: {p['base_experience']}", cid)
+
+    @command("dict", "hello", aliases=("dictionary",))
+    def cmd_dict(self, word, cid):
+        d = self.get_dictionary(word)
+        return self.sendMessage(f"📖 {word}: {d['meanings'][0]['definitions'][0]['definition']}", cid)
+
+    @command("qr", "HelloWorld")
+    def cmd_qr(self, txt, cid):
+        return self.sendPhoto(cid, self.get_qr(txt))
+
+    @command("nasa")
+    def cmd_nasa(self, arg, cid):
+        d = self.within(self.get_nasa_apod)
+        if not d:
+            return self.sendMessage("🌌 NASA is slow right now, try again soon.", cid)
+        # the explanation is longer than a caption allows; photo first, then the text
+        self.sendPhoto(cid, d["url"])
+        return self.sendMessage(f"🌌 {d['title']}\n{d['explanation']}", cid)
+
+    @command("worldbank", "IN")
+    def cmd_worldbank(self, code, cid):
+        d = self.get_worldbank(code)
+        return self.sendMessage(f"🏦 {d['name']} ({d['region']['value']})", cid)
+
+    @command("marvel", "Iron Man")
+    def cmd_marvel(self, name, cid):
+        d = self.get_marvel(name)
+        return self.sendMessage(f"🦸 {d['name']}\n{d['description']}", cid)
+
+    @command("remindme", aliases=("remind",))
+    def cmd_remindme(self, arg, cid):
+        try:
+            seconds, msg = arg.split(" ", 1)
+            seconds = int(seconds)
+        except (AttributeError, ValueError):
+            return self.sendMessage("❌ Usage: /remindme 10 Take a break", cid)
+        self.add_reminder(time.time() + seconds, cid, msg)
+        return self.sendMessage(f"⏰ Reminder set in {seconds} sec: {msg}", cid)
+
+    @command("start", aliases=("help",))
+    def cmd_start(self, arg, cid):
+        return self.sendMessage(
+            "Welcome! 🎉\n"
+            "Try: /movie /weather /news /waifu /pickup /dog /cat /joke /bored /meal /cocktail /poem "
+            "/art /country /pokemon /dict /qr /nasa /worldbank /marvel /remindme",
+            cid
+        )
 
     # ----------------- MESSAGE HANDLER -----------------
     def messageHandler(self, text, cid):
-        if text.startswith("/movie"):
-            name = text.split(" ", 1)[1] if " " in text else "Inception"
-            d = self.get_movie(name)
-            return self.sendMessage(f"🎬 {d.get('Title')} ({d.get('Year')})\n{d.get('Plot')}", cid)
+        if not text.startswith("/"):
+            return
+        token, _, arg = text.partition(" ")
+        name, _, target = token[1:].partition("@")
+        if target and self.username and target.lower() != self.username.lower():
+            return
+        entry = self.commands.get(name.lower())
+        if entry is None:
+            return
+        handler, default_arg = entry
+        arg = arg.strip()
+        with self.metrics.timer("handler", name.lower()):
+            return handler(arg or default_arg, cid)
 
-        if text.startswith("/weather"):
-            city = text.split(" ", 1)[1] if " " in text else "London"
-            d = self.get_weather(city)
-            return self.sendMessage(f"🌤 {city}: {d['main']['temp']}°C, {d['weather'][0]['description']}", cid)
-
-        if text == "/news":
-            arts = self.get_news()["articles"][:3]
-            msg = "\n\n".join([f"📰 {a['title']}\n{a['url']}" for a in arts])
-            return self.sendMessage(msg, cid)
-
-        if text.startswith("/waifu"):
-            tag = text.split(" ", 1)[1] if " " in text else "maid"
-            return self.sendPhoto(cid, self.get_waifu(tag))
-
-        if text == "/pickup":
-            return self.sendMessage(self.get_pickup(), cid)
-
-        if text == "/pickup2":
-            return self.sendMessage(self.get_pickup2(), cid)
-
-        if text == "/dog":
-            return self.sendPhoto(cid, self.get_dog())
-
-        if text == "/cat":
-            return self.sendPhoto(cid, self.get_cat())
-
-        if text == "/joke":
-            return self.sendMessage(self.get_joke(), cid)
-
-        if text == "/bored":
-            return self.sendMessage(self.get_bored(), cid)
-
-        if text.startswith("/meal"):
-            meal = self.get_meal()
-            return self.sendMessage(f"🍽 {meal['strMeal']}\n{meal['strInstructions']}", cid)
-
-        if text.startswith("/cocktail"):
-            drink = self.get_cocktail()
-            return self.sendMessage(f"🍹 {drink['strDrink']}\n{drink['strInstructions']}", cid)
-
-        if text.startswith("/poem"):
-            return self.sendMessage(f"📜 Poem: {self.get_poem()}", cid)
-
-        if text.startswith("/art"):
-            return self.sendMessage(f"🎨 Artwork: {self.get_art()}", cid)
-
-        if text.startswith("/country"):
-            name = text.split(" ", 1)[1] if " " in text else "India"
-            c = self.get_country(name)
-            return self.sendMessage(f"🌍 {c['name']['common']} - Capital: {c['capital'][0]}", cid)
-
-        if text.startswith("/pokemon"):
-            pid = text.split(" ", 1)[1] if " " in text else "1"
-            p = self.get_pokemon(pid)
-            return self.sendMessage(f"⚡ {p['name'].title()} - Base XP: {p['base_experience']}", cid)
-
-        if text.startswith("/dict"):
-            word = text.split(" ", 1)[1] if " " in text else "hello"
-            d = self.get_dictionary(word)
-            return self.sendMessage(f"📖 {word}: {d['meanings'][0]['definitions'][0]['definition']}", cid)
-
-        if text.startswith("/qr"):
-            txt = text.split(" ", 1)[1] if " " in text else "HelloWorld"
-            return self.sendPhoto(cid, self.get_qr(txt))
-
-        if text == "/nasa":
-            d = self.get_nasa_apod()
-            self.sendPhoto(cid, d["url"])
-            return self.sendMessage(f"🌌 {d['title']}\n{d['explanation']}", cid)
-
-        if text.startswith("/worldbank"):
-            code = text.split(" ", 1)[1] if " " in text else "IN"
-            d = self.get_worldbank(code)
-            return self.sendMessage(f"🏦 {d['name']} ({d['region']['value']})", cid)
-
-        if text.startswith("/marvel"):
-            name = text.split(" ", 1)[1] if " " in text else "Iron Man"
-            d = self.get_marvel(name)
-            return self.sendMessage(f"🦸 {d['name']}\n{d['description']}", cid)
-
-        if text.startswith("/remindme"):
+    # ----------------- REMINDERS -----------------
+    def load_reminders(self):
+        if not self.reminders_file or not os.path.exists(self.reminders_file):
+            return
+        with open(self.reminders_file) as f:
+            for due, cid, msg in json.load(f):
+                self.reminders.append((due, next(self.reminder_seq), cid, msg))
+        heapq.heapify(self.reminders)
+
+    def save_reminders(self):
+        # just marks the heap dirty; reminder_writer does the actual write
+        if self.reminders_file:
+            self.reminders_dirty.set()
+
+    def flush_reminders(self):
+        with self.reminder_lock:
+            pending = [(r[0], r[2], r[3]) for r in self.reminders]
+        tmp = self.reminders_file + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(pending, f)
+        os.replace(tmp, self.reminders_file)
+
+    def reminder_writer(self, debounce=1.0):
+        # the only thread that writes the file: one rewrite per burst of adds/fires,
+        # at most once per debounce interval, never on the event loop
+        while True:
+            self.reminders_dirty.wait()
+            time.sleep(debounce)
+            self.reminders_dirty.clear()
             try:
-                parts = text.split(" ", 2)
-                seconds = int(parts[1])
-                msg = parts[2]
-                self.reminders.append((time.time() + seconds, cid, msg))
-                return self.sendMessage(f"⏰ Reminder set in {seconds} sec: {msg}", cid)
-            except:
-                return self.sendMessage("❌ Usage: /remindme 10 Take a break", cid)
-
-        if text == "/start":
-            return self.sendMessage(
-                "Welcome! 🎉\n"
-                "Try: /movie /weather /news /waifu /pickup /dog /cat /joke /bored /meal /cocktail /poem "
-                "/art /country /pokemon /dict /qr /nasa /worldbank /marvel /remindme",
-                cid
-            )
+                self.flush_reminders()
+            except OSError as e:
+                print(f"Could not save reminders: {e}")
+
+    def add_reminder(self, due, cid, msg):
+        with self.reminder_lock:
+            earliest = not self.reminders or due < self.reminders[0][0]
+            heapq.heappush(self.reminders, (due, next(self.reminder_seq), cid, msg))
+        self.save_reminders()
+        # only an earlier deadline changes how long the loop should sleep
+        if earliest and self.loop:
+            self.loop.call_soon_threadsafe(self.reminder_wake.set)
 
-    # ----------------- REMINDERS -----------------
     async def reminder_loop(self):
+        self.loop = asyncio.get_running_loop()
+        self.reminder_wake = asyncio.Event()
         while True:
             now = time.time()
-            for r in self.reminders[:]:
-                if now >= r[0]:
-                    self.sendMessage(f"🔔 Reminder: {r[2]}", r[1])
-                    self.reminders.remove(r)
-            await asyncio.sleep(2)
+            due = []
+            with self.reminder_lock:
+                while self.reminders and self.reminders[0][0] <= now:
+                    due.append(heapq.heappop(self.reminders))
+                delay = self.reminders[0][0] - now if self.reminders else None
+            for _, _, cid, msg in due:
+                payload = {"chat_id": cid, "text": f"🔔 Reminder: {msg}"}
+                self.outbox.send(f"{self.base_url}/sendMessage", cid, BULK, data=payload)
+            if due:
+                self.save_reminders()
+            self.reminder_wake.clear()
+            try:
+                await asyncio.wait_for(self.reminder_wake.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    # ----------------- DISPATCH -----------------
+    def dispatch(self, text, cid):
+        # returns a Future that resolves once this update's handler has finished
+        done = Future()
+        with self.chat_lock:
+            q = self.chat_queues.get(cid)
+            if q is not None:
+                q.append((text, done))
+                return done
+            self.chat_queues[cid] = deque([(text, done)])
+        self.pool.submit(self.drain_chat, cid)
+        return done
+
+    def drain_chat(self, cid):
+        while True:
+            with self.chat_lock:
+                q = self.chat_queues[cid]
+                if not q:
+                    del self.chat_queues[cid]
+                    return
+                text, done = q.popleft()
+            try:
+                self.messageHandler(text, cid)
+            except Exception as e:
+                print(f"Handler error for {cid}: {e}")
+            finally:
+                done.set_result(None)
+
+    # ----------------- OFFSET -----------------
+    # offset_file is a small journal: the next getUpdates offset plus every update
+    # below it whose handler hasn't finished. It is written before that offset is
+    # sent (which confirms the updates to Telegram), so after a crash the
+    # unfinished ones are replayed from the journal instead of being lost.
+    def load_offset(self):
+        if not self.offset_file or not os.path.exists(self.offset_file):
+            return None
+        with open(self.offset_file) as f:
+            raw = f.read().strip()
+        if not raw.startswith("{"):
+            return int(raw or 0) or None  # older files hold just the offset
+        state = json.loads(raw)
+        for u in state.get("pending", []):
+            self.pending[u["update_id"]] = u
+        return state.get("offset")
+
+    def save_offset(self):
+        # one fsync per poll, atomically replaced so a crash never leaves a torn file
+        with self.pending_cond:
+            self.journal_dirty = False
+            state = {"offset": self.offset, "pending": [self.pending[k] for k in sorted(self.pending)]}
+        if not self.offset_file:
+            return
+        tmp = self.offset_file + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.offset_file)
+
+    # ----------------- METRICS -----------------
+    async def start_metrics(self):
+        if self.metrics_port:
+            await self.metrics.serve(port=self.metrics_port)
+        if self.metrics_file:
+            asyncio.create_task(self.metrics.dump_loop(self.metrics_file))
 
     # ----------------- RUN -----------------
+    def handleUpdate(self, update):
+        if "message" not in update:
+            return
+        cid = update["message"]["chat"]["id"]
+        text = update["message"].get("text", "")
+        return self.dispatch(text, cid)
+
+    def handleBatch(self, updates):
+        # no barrier: the batch is dispatched and the next getUpdates goes out while
+        # it runs. Each update stays in the journal until its handler finishes.
+        with self.pending_cond:
+            for u in updates:
+                self.pending[u["update_id"]] = u
+            self.journal_dirty = True
+        self.offset = updates[-1]["update_id"] + 1
+        for u in updates:
+            self.track(u)
+
+    def track(self, update):
+        done = self.handleUpdate(update)
+        if done is None:
+            return self.finish(update["update_id"])
+        done.add_done_callback(lambda f, uid=update["update_id"]: self.finish(uid))
+
+    def finish(self, uid):
+        with self.pending_cond:
+            self.pending.pop(uid, None)
+            self.journal_dirty = True
+            self.pending_cond.notify_all()
+
+    def backoff(self, retry_after=None):
+        self.poll_failures += 1
+        return retry_after or random.uniform(0, min(60, 2 ** (self.poll_failures - 1)))
+
+    def poll_once(self):
+        # one getUpdates round; returns how long to wait before the next
+        with self.pending_cond:
+            # handlers that stall everywhere eventually stop the poll instead of piling up
+            self.pending_cond.wait_for(lambda: len(self.pending) < self.max_pending)
+        if self.journal_dirty:
+            self.save_offset()
+        try:
+            res = self.getUpdates()
+        except (req.RequestException, ValueError) as e:
+            print(f"getUpdates failed: {e}")
+            return self.backoff()
+        if not res.get("ok", True) or "result" not in res:
+            print(f"getUpdates error: {res.get('description')}")
+            return self.backoff(res.get("parameters", {}).get("retry_after"))
+        self.poll_failures = 0
+        if res["result"]:
+            self.handleBatch(res["result"])
+        return 0
+
     async def run(self):
         print("Bot is running...")
+        loop = asyncio.get_running_loop()
         asyncio.create_task(self.reminder_loop())
+        await self.start_metrics()
+        with self.pending_cond:
+            replay = [self.pending[k] for k in sorted(self.pending)]
+        if replay:
+            print(f"Replaying {len(replay)} unfinished updates from the journal")
+        for u in replay:
+            self.track(u)
         while True:
-            updates = self.getUpdates()
-            if updates["result"]:
-                for update in updates["result"]:
-                    self.offset = update["update_id"] + 1
-                    cid = update["message"]["chat"]["id"]
-                    text = update["message"].get("text", "")
-                    print(update)
-                    self.messageHandler(text, cid)
+            delay = await loop.run_in_executor(None, self.poll_once)
+            if delay:
+                await asyncio.sleep(delay)
+
+    async def run_webhook(self, url, secret, port=8443):
+        print(set_webhook(self.base_url, url, secret))
+        asyncio.create_task(self.reminder_loop())
+        await self.start_metrics()
+        await WebhookServer(self.handleUpdate, secret, port=port, metrics=self.metrics).serve()
 
 # ----------------- START BOT -----------------
 if __name__ == "__main__":
     token = "8016088849:AAG_kMh8ioaMHe6_Fq12hixbwRYF5hX-8I0"
-    bot = TeleBot(token)
+    bot = TeleBot(token, cache_db="cache.db", reminders_file="reminders.json", offset_file="offset.txt")
     asyncio.run(bot.run())
\ No newline at end of file
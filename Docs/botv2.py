@@ -2,10 +2,12 @@ import requests as req
 import asyncio
 import time
 import hashlib
+from sendqueue import Outbox
 
 class TeleBot:
     def __init__(self, token):
         self.token = token
+        self.outbox = Outbox()
         self.base_url = f"https://api.telegram.org/bot{token}"
         self.offset = None
         self.reminders = []
@@ -19,7 +21,7 @@ class TeleBot:
         payload = {"chat_id": cid, "text": text}
         if keyboard:
             payload["reply_markup"] = keyboard
-        return req.post(f"{self.base_url}/sendMessage", json=payload).json()
+        return self.outbox.send(f"{self.base_url}/sendMessage", cid, json=payload).result()
 
     def sendPhoto(self, cid, url, caption=None, keyboard=None):
         payload = {"chat_id": cid, "photo": url}
@@ -27,7 +29,7 @@ class TeleBot:
             payload["caption"] = caption
         if keyboard:
             payload["reply_markup"] = keyboard
-        return req.post(f"{self.base_url}/sendPhoto", json=payload).json()
+        return self.outbox.send(f"{self.base_url}/sendPhoto", cid, json=payload).result()
 
     def answerCallback(self, callback_id, text="✅ Done"):
         payload = {"callback_query_id": callback_id, "text": text}
@@ -1,10 +1,12 @@
 import requests as req
 import asyncio
 import time
+from sendqueue import Outbox
 
 class TeleBot:
     def __init__(self, token):
         self.token = token
+        self.outbox = Outbox()
         self.base_url = f"https://api.telegram.org/bot{token}"
         self.offset = None
         self.reminders = []
@@ -15,15 +17,15 @@ class TeleBot:
 
     def sendMessage(self, text, cid):
         payload = {"chat_id": cid, "text": text}
-        return req.post(f"{self.base_url}/sendMessage", data=payload).json()
+        return self.outbox.send(f"{self.base_url}/sendMessage", cid, data=payload).result()
 
     def sendSticker(self, cid, sticker_id):
         payload = {"chat_id": cid, "sticker": sticker_id}
-        return req.post(f"{self.base_url}/sendSticker", data=payload).json()
+        return self.outbox.send(f"{self.base_url}/sendSticker", cid, data=payload).result()
 
     def sendPhoto(self, cid, url):
         payload = {"chat_id": cid, "photo": url}
-        return req.post(f"{self.base_url}/sendPhoto", data=payload).json()
+        return self.outbox.send(f"{self.base_url}/sendPhoto", cid, data=payload).result()
 
     # ----------------- API HELPERS -----------------
     def get_movie(self, name):
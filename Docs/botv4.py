@@ -2,10 +2,31 @@ import requests as req
 import asyncio
 import time
 import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from webhook import WebhookServer, set_webhook
+from sendqueue import Outbox
+from keyboards import KeyboardRegistry, splice_markup
+
+# ----------------- KEYBOARDS -----------------
+MENU_ACTIONS = [
+    ("🐶 Dog", "dog"), ("🐱 Cat", "cat"),
+    ("😂 Joke", "joke"), ("💬 Pickup", "pickup"),
+    ("🌌 NASA", "nasa"), ("📰 News", "news"),
+    ("🌤 Weather", "weather"), ("🎬 Movie", "movie"),
+    ("🍽 Meal", "meal"), ("🍹 Cocktail", "cocktail"),
+    ("🌍 Country", "country"), ("⚡ Pokemon", "pokemon"),
+]
+KEYBOARDS = KeyboardRegistry()
+KEYBOARDS.add_pages("menu", MENU_ACTIONS)
 
 class TeleBot:
     def __init__(self, token):
         self.token = token
+        self.outbox = Outbox()
+        # content fetches run here, never on the poll loop
+        self.jobs = ThreadPoolExecutor(max_workers=8)
+        # acks get their own threads so slow fetches in self.jobs can't hold up a spinner
+        self.acks = ThreadPoolExecutor(max_workers=2)
         self.base_url = f"https://api.telegram.org/bot{token}"
         self.offset = None
 
@@ -14,23 +35,44 @@ class TeleBot:
         payload = {"offset": self.offset, "timeout": 30}
         return req.get(f"{self.base_url}/getUpdates", params=payload).json()
 
-    def sendMessage(self, text, cid, keyboard=None):
-        payload = {"chat_id": cid, "text": text}
+    def send(self, method, cid, payload, keyboard=None):
+        # keyboard is either a dict or a pre-encoded string from KEYBOARDS
+        url = f"{self.base_url}/{method}"
+        if isinstance(keyboard, str):
+            body = splice_markup(payload, keyboard)
+            return self.outbox.send(url, cid, data=body, headers={"Content-Type": "application/json"}).result()
         if keyboard:
             payload["reply_markup"] = keyboard
-        return req.post(f"{self.base_url}/sendMessage", json=payload).json()
+        return self.outbox.send(url, cid, json=payload).result()
+
+    def sendMessage(self, text, cid, keyboard=None):
+        payload = {"chat_id": cid, "text": text}
+        return self.send("sendMessage", cid, payload, keyboard)
 
     def sendPhoto(self, cid, url, caption=None, keyboard=None):
         payload = {"chat_id": cid, "photo": url}
         if caption:
             payload["caption"] = caption
-        if keyboard:
-            payload["reply_markup"] = keyboard
-        return req.post(f"{self.base_url}/sendPhoto", json=payload).json()
+        return self.send("sendPhoto", cid, payload, keyboard)
+
+    def editMenu(self, cid, message, text, name):
+        # edit the menu message in place; skip calls Telegram would reject as "not modified"
+        same_text = message.get("text") == text
+        if same_text and KEYBOARDS.matches(name, message.get("reply_markup")):
+            return None
+        payload = {"chat_id": cid, "message_id": message["message_id"]}
+        if same_text:
+            res = self.send("editMessageReplyMarkup", cid, payload, KEYBOARDS[name])
+        else:
+            payload["text"] = text
+            res = self.send("editMessageText", cid, payload, KEYBOARDS[name])
+        if not res.get("ok") and "not modified" in res.get("description", ""):
+            return None
+        return res
 
     def answerCallback(self, callback_id, text="✅ Done"):
         payload = {"callback_query_id": callback_id, "text": text}
-        return req.post(f"{self.base_url}/answerCallbackQuery", data=payload).json()
+        return req.post(f"{self.base_url}/answerCallbackQuery", data=payload, timeout=5).json()
 
     # ----------------- API HELPERS -----------------
     def get_dog(self): return req.get("https://dog.ceo/api/breeds/image/random").json()["message"]
@@ -48,81 +90,79 @@ class TeleBot:
     def get_country(self, name="india"): return req.get(f"https://restcountries.com/v3.1/name/{name}").json()[0]
     def get_pokemon(self, pid=1): return req.get(f"https://pokeapi.co/api/v2/pokemon/{pid}").json()
 
-    # ----------------- KEYBOARDS -----------------
-    def menu_page1(self):
-        return {
-            "inline_keyboard": [
-                [{"text": "🐶 Dog", "callback_data": "dog"},
-                 {"text": "🐱 Cat", "callback_data": "cat"}],
-                [{"text": "😂 Joke", "callback_data": "joke"},
-                 {"text": "💬 Pickup", "callback_data": "pickup"}],
-                [{"text": "🌌 NASA", "callback_data": "nasa"},
-                 {"text": "📰 News", "callback_data": "news"}],
-                [{"text": "⏭ Next", "callback_data": "menu2"}]
-            ]
-        }
-
-    def menu_page2(self):
-        return {
-            "inline_keyboard": [
-                [{"text": "🌤 Weather", "callback_data": "weather"},
-                 {"text": "🎬 Movie", "callback_data": "movie"}],
-                [{"text": "🍽 Meal", "callback_data": "meal"},
-                 {"text": "🍹 Cocktail", "callback_data": "cocktail"}],
-                [{"text": "🌍 Country", "callback_data": "country"},
-                 {"text": "⚡ Pokemon", "callback_data": "pokemon"}],
-                [{"text": "⏮ Back", "callback_data": "menu1"}]
-            ]
-        }
-
     # ----------------- MESSAGE HANDLER -----------------
     def messageHandler(self, text, cid):
         if text == "/start":
-            return self.sendMessage("Welcome! 🎉\nChoose an option:", cid, self.menu_page1())
-
-    def callbackHandler(self, data, cid, callback_id):
-        self.answerCallback(callback_id)
-
-        if data == "menu1":
-            return self.sendMessage("📖 Page 1:", cid, self.menu_page1())
-        if data == "menu2":
-            return self.sendMessage("📖 Page 2:", cid, self.menu_page2())
-
-        if data == "dog": return self.sendPhoto(cid, self.get_dog(), "🐶 Here's a dog!")
-        if data == "cat": return self.sendPhoto(cid, self.get_cat(), "🐱 Here's a cat!")
-        if data == "pickup": return self.sendMessage(f"💬 {self.get_pickup()}", cid)
-        if data == "joke": return self.sendMessage(f"😂 {self.get_joke()}", cid)
-
-        if data == "nasa":
-            d = self.get_nasa()
-            return self.sendPhoto(cid, d["url"], f"🌌 {d['title']}\n{d['explanation']}")
-        if data == "news":
-            arts = self.get_news()
-            msg = "\n\n".join([f"📰 {a['title']}\n{a['url']}" for a in arts])
-            return self.sendMessage(msg, cid)
-
-        if data == "weather":
-            w = self.get_weather("London")
-            return self.sendMessage(f"🌤 London: {w['main']['temp']}°C, {w['weather'][0]['description']}", cid)
-        if data == "movie":
-            m = self.get_movie("Inception")
-            return self.sendMessage(f"🎬 {m['Title']} ({m['Year']})\n{m['Plot']}", cid)
-
-        if data == "meal":
-            meal = self.get_meal()
-            return self.sendMessage(f"🍽 {meal['strMeal']}\n{meal['strInstructions']}", cid)
-        if data == "cocktail":
-            drink = self.get_cocktail()
-            return self.sendMessage(f"🍹 {drink['strDrink']}\n{drink['strInstructions']}", cid)
-
-        if data == "country":
-            c = self.get_country("India")
-            return self.sendMessage(f"🌍 {c['name']['common']} - Capital: {c['capital'][0]}", cid)
-        if data == "pokemon":
-            p = self.get_pokemon(25)
-            return self.sendMessage(f"⚡ {p['name'].title()} - Base XP: {p['base_experience']}", cid)
+            return self.sendMessage("Welcome! 🎉\nChoose an option:", cid, KEYBOARDS["menu1"])
+
+    def submit(self, pool, fn, *args):
+        # nobody waits on these futures, so failures are logged here
+        fut = pool.submit(fn, *args)
+        fut.add_done_callback(self.log_failure)
+        return fut
+
+    def log_failure(self, fut):
+        if not fut.cancelled() and fut.exception():
+            print(f"Background job failed: {fut.exception()!r}")
+
+    def callbackHandler(self, data, cid, callback_id, message=None):
+        # ack right away so the button spinner clears, then do the real work off the poll loop
+        self.submit(self.acks, self.answerCallback, callback_id)
+
+        if data in KEYBOARDS.encoded:
+            # add_pages names pages menu1..menuN
+            text = f"📖 Page {data.removeprefix('menu')}:"
+            if message:
+                return self.submit(self.jobs, self.editMenu, cid, message, text, data)
+            return self.submit(self.jobs, self.sendMessage, text, cid, KEYBOARDS[data])
+
+        if data in CONTENT:
+            return self.submit(self.jobs, self.deliver, data, cid)
+
+    def deliver(self, data, cid):
+        # without a placeholder (send failed) the result is just sent as a new message
+        placeholder = None
+        try:
+            res = self.sendMessage("⏳ Loading…", cid)
+            if res.get("ok"):
+                placeholder = res["result"]["message_id"]
+            else:
+                print(f"Placeholder for {data} failed: {res.get('description')}")
+        except Exception as e:
+            print(f"Placeholder for {data} failed: {e}")
+
+        try:
+            kind, *content = CONTENT[data](self)
+        except Exception as e:
+            print(f"Content fetch for {data} failed: {e}")
+            kind, content = "text", ["⚠️ Couldn't load that, try again."]
+        if kind == "text":
+            if placeholder is None:
+                return self.sendMessage(content[0], cid)
+            return self.editText(cid, placeholder, content[0])
+        # a text message can't be edited into a photo, so send it and drop the placeholder
+        res = self.sendPhoto(cid, *content)
+        if placeholder is not None:
+            self.send("deleteMessage", cid, {"chat_id": cid, "message_id": placeholder})
+        return res
+
+    def editText(self, cid, message_id, text):
+        return self.send("editMessageText", cid, {"chat_id": cid, "message_id": message_id, "text": text})
 
     # ----------------- RUN -----------------
+    def handleUpdate(self, update):
+        if "message" in update and "text" in update["message"]:
+            cid = update["message"]["chat"]["id"]
+            text = update["message"]["text"]
+            self.messageHandler(text, cid)
+
+        if "callback_query" in update:
+            cq = update["callback_query"]
+            cid = cq["message"]["chat"]["id"]
+            data = cq["data"]
+            cb_id = cq["id"]
+            self.callbackHandler(data, cid, cb_id, cq.get("message"))
+
     async def run(self):
         print("Bot running with multi-page menu...")
         while True:
@@ -130,18 +170,61 @@ class TeleBot:
             if updates["result"]:
                 for update in updates["result"]:
                     self.offset = update["update_id"] + 1
-
-                    if "message" in update and "text" in update["message"]:
-                        cid = update["message"]["chat"]["id"]
-                        text = update["message"]["text"]
-                        self.messageHandler(text, cid)
-
-                    if "callback_query" in update:
-                        cq = update["callback_query"]
-                        cid = cq["message"]["chat"]["id"]
-                        data = cq["data"]
-                        cb_id = cq["id"]
-                        self.callbackHandler(data, cid, cb_id)
+                    self.handleUpdate(update)
+
+    async def run_webhook(self, url, secret, port=8443):
+        print(set_webhook(self.base_url, url, secret))
+        await WebhookServer(self.handleUpdate, secret, port=port).serve()
+
+
+# ----------------- CONTENT -----------------
+# callback_data -> fetcher returning ("text", msg) or ("photo", url, caption)
+def nasa_content(bot):
+    d = bot.get_nasa()
+    return "photo", d["url"], f"🌌 {d['title']}\n{d['explanation']}"
+
+def news_content(bot):
+    arts = bot.get_news()
+    return "text", "\n\n".join([f"📰 {a['title']}\n{a['url']}" for a in arts])
+
+def weather_content(bot):
+    w = bot.get_weather("London")
+    return "text", f"🌤 London: {w['main']['temp']}°C, {w['weather'][0]['description']}"
+
+def movie_content(bot):
+    m = bot.get_movie("Inception")
+    return "text", f"🎬 {m['Title']} ({m['Year']})\n{m['Plot']}"
+
+def meal_content(bot):
+    meal = bot.get_meal()
+    return "text", f"🍽 {meal['strMeal']}\n{meal['strInstructions']}"
+
+def cocktail_content(bot):
+    drink = bot.get_cocktail()
+    return "text", f"🍹 {drink['strDrink']}\n{drink['strInstructions']}"
+
+def country_content(bot):
+    c = bot.get_country("India")
+    return "text", f"🌍 {c['name']['common']} - Capital: {c['capital'][0]}"
+
+def pokemon_content(bot):
+    p = bot.get_pokemon(25)
+    return "text", f"⚡ {p['name'].title()} - Base XP: {p['base_experience']}"
+
+CONTENT = {
+    "dog": lambda bot: ("photo", bot.get_dog(), "🐶 Here's a dog!"),
+    "cat": lambda bot: ("photo", bot.get_cat(), "🐱 Here's a cat!"),
+    "pickup": lambda bot: ("text", f"💬 {bot.get_pickup()}"),
+    "joke": lambda bot: ("text", f"😂 {bot.get_joke()}"),
+    "nasa": nasa_content,
+    "news": news_content,
+    "weather": weather_content,
+    "movie": movie_content,
+    "meal": meal_content,
+    "cocktail": cocktail_content,
+    "country": country_content,
+    "pokemon": pokemon_content,
+}
 
 
 # ----------------- START BOT -----------------
@@ -1,10 +1,23 @@
 import requests as req
 import asyncio
 import hashlib
+from sendqueue import Outbox
+from keyboards import KeyboardRegistry, splice_markup
+
+# ----------------- MENUS -----------------
+MENU_ACTIONS = [
+    ("🐶 Dog","dog"),("🐱 Cat","cat"),("😂 Joke","joke"),("💬 Pickup","pickup"),("🌌 NASA","nasa"),("📰 News","news"),
+    ("🌤 Weather","weather"),("🎬 Movie","movie"),("🍽 Meal","meal"),("🍹 Cocktail","cocktail"),("🌍 Country","country"),("⚡ Pokémon","pokemon"),
+    ("📚 Dictionary","dict"),("🖼 Art","art"),("📖 Poetry","poetry"),("💤 Bored","bored"),("🦸 Marvel","marvel"),("📊 WorldBank","worldbank"),
+    ("📸 QR","qr"),("🎴 Waifu","waifu"),("📚 OpenLib","openlib"),("🎶 Pickup2","pickup2"),("📡 AP Test","ap"),("🔑 GA Test","ga"),
+]
+KEYBOARDS = KeyboardRegistry()
+KEYBOARDS.add_pages("menu", MENU_ACTIONS)
 
 class TeleBot:
     def __init__(self, token):
         self.token = token
+        self.outbox = Outbox()
         self.base_url = f"https://api.telegram.org/bot{token}"
         self.offset = None
 
@@ -14,13 +27,16 @@ class TeleBot:
 
     def sendMessage(self, text, cid, keyboard=None):
         payload = {"chat_id": cid, "text": text}
+        if isinstance(keyboard, str):
+            body = splice_markup(payload, keyboard)
+            return self.outbox.send(f"{self.base_url}/sendMessage", cid, data=body, headers={"Content-Type": "application/json"}).result()
         if keyboard: payload["reply_markup"] = keyboard
-        return req.post(f"{self.base_url}/sendMessage", json=payload).json()
+        return self.outbox.send(f"{self.base_url}/sendMessage", cid, json=payload).result()
 
     def sendPhoto(self, cid, url, caption=None):
         payload = {"chat_id": cid, "photo": url}
         if caption: payload["caption"] = caption
-        return req.post(f"{self.base_url}/sendPhoto", data=payload).json()
+        return self.outbox.send(f"{self.base_url}/sendPhoto", cid, data=payload).result()
 
     def answerCallback(self, cbid, text="✅ Done"):
         return req.post(f"{self.base_url}/answerCallbackQuery", data={"callback_query_id": cbid, "text": text}).json()
@@ -55,43 +71,13 @@ class TeleBot:
     def get_waifu(self): return req.get("https://api.waifu.im/search?included_tags=maid").json()["images"][0]["url"]
     def get_openlib(self): return req.get("https://openlibrary.org/search.json?q=wednesday").json()["docs"][0]
 
-    # ----------------- MENUS -----------------
-    def menu1(self):
-        return {"inline_keyboard":[
-            [{"text":"🐶 Dog","callback_data":"dog"},{"text":"🐱 Cat","callback_data":"cat"}],
-            [{"text":"😂 Joke","callback_data":"joke"},{"text":"💬 Pickup","callback_data":"pickup"}],
-            [{"text":"🌌 NASA","callback_data":"nasa"},{"text":"📰 News","callback_data":"news"}],
-            [{"text":"⏭ Next","callback_data":"menu2"}]
-        ]}
-    def menu2(self):
-        return {"inline_keyboard":[
-            [{"text":"🌤 Weather","callback_data":"weather"},{"text":"🎬 Movie","callback_data":"movie"}],
-            [{"text":"🍽 Meal","callback_data":"meal"},{"text":"🍹 Cocktail","callback_data":"cocktail"}],
-            [{"text":"🌍 Country","callback_data":"country"},{"text":"⚡ Pokémon","callback_data":"pokemon"}],
-            [{"text":"⏮ Back","callback_data":"menu1"},{"text":"⏭ Next","callback_data":"menu3"}]
-        ]}
-    def menu3(self):
-        return {"inline_keyboard":[
-            [{"text":"📚 Dictionary","callback_data":"dict"},{"text":"🖼 Art","callback_data":"art"}],
-            [{"text":"📖 Poetry","callback_data":"poetry"},{"text":"💤 Bored","callback_data":"bored"}],
-            [{"text":"🦸 Marvel","callback_data":"marvel"},{"text":"📊 WorldBank","callback_data":"worldbank"}],
-            [{"text":"⏮ Back","callback_data":"menu2"},{"text":"⏭ Next","callback_data":"menu4"}]
-        ]}
-    def menu4(self):
-        return {"inline_keyboard":[
-            [{"text":"📸 QR","callback_data":"qr"},{"text":"🎴 Waifu","callback_data":"waifu"}],
-            [{"text":"📚 OpenLib","callback_data":"openlib"},{"text":"🎶 Pickup2","callback_data":"pickup2"}],
-            [{"text":"📡 AP Test","callback_data":"ap"},{"text":"🔑 GA Test","callback_data":"ga"}],
-            [{"text":"⏮ Back","callback_data":"menu3"}]
-        ]}
-
     # ----------------- HANDLERS -----------------
     def messageHandler(self, text, cid):
-        if text=="/start": self.sendMessage("Welcome 🚀 Pick an option:", cid, self.menu1())
+        if text=="/start": self.sendMessage("Welcome 🚀 Pick an option:", cid, KEYBOARDS["menu1"])
 
     def callbackHandler(self, data, cid, cbid):
         self.answerCallback(cbid)
-        if data.startswith("menu"): return self.sendMessage("📖 Menu:", cid, getattr(self, data)())
+        if data in KEYBOARDS.encoded: return self.sendMessage("📖 Menu:", cid, KEYBOARDS[data])
 
         if data=="dog": return self.sendPhoto(cid, self.get_dog(), "🐶 Woof!")
         if data=="cat": return self.sendPhoto(cid, self.get_cat(), "🐱 Meow!")
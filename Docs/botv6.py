@@ -1,27 +1,45 @@
 import requests as req
 import asyncio
 import hashlib
+import json
+import time
+from sendqueue import Outbox
+
+TG_LIMIT = 4096  # counted in UTF-16 code units, as Telegram does
+OPENROUTER_URL = "https://openrouter.ai/api/v1/chat/completions"
+
+
+def tg_len(s):
+    # emoji and other astral characters count as two
+    return len(s.encode("utf-16-le")) // 2
+
+
+def tg_cut(s, limit):
+    # longest prefix of s (as a str index) that fits in limit UTF-16 units, never splitting a surrogate pair
+    return len(s.encode("utf-16-le")[:limit * 2].decode("utf-16-le", "ignore"))
 
 class TeleBot:
     def __init__(self, token, or_key=None):
         self.token = token
+        self.outbox = Outbox()
         self.or_key = or_key
+        self.or_url = OPENROUTER_URL
         self.base_url = f"https://api.telegram.org/bot{token}"
         self.offset = None
 
     # ----------------- TELEGRAM -----------------
     def getUpdates(self):
-        return req.get(f"{self.base_url}/getUpdates", params={"offset": self.offset, "timeout": 30}).json()
+        return req.get(f"{self.base_url}/getUpdates", params={"offset": self.offset, "timeout": 30}, timeout=40).json()
 
     def sendMessage(self, text, cid, keyboard=None):
         payload = {"chat_id": cid, "text": text}
         if keyboard: payload["reply_markup"] = keyboard
-        return req.post(f"{self.base_url}/sendMessage", json=payload).json()
+        return self.outbox.send(f"{self.base_url}/sendMessage", cid, json=payload).result()
 
     def sendPhoto(self, cid, url, caption=None):
         payload = {"chat_id": cid, "photo": url}
         if caption: payload["caption"] = caption
-        return req.post(f"{self.base_url}/sendPhoto", data=payload).json()
+        return self.outbox.send(f"{self.base_url}/sendPhoto", cid, data=payload).result()
 
     def answerCallback(self, cbid, text="✅ Done"):
         return req.post(f"{self.base_url}/answerCallbackQuery", data={"callback_query_id": cbid, "text": text}).json()
@@ -39,12 +57,91 @@ class TeleBot:
                 {"role": "user", "content": query}
             ]
         }
-        r = req.post("https://openrouter.ai/api/v1/chat/completions", headers=headers, json=data)
+        r = req.post(self.or_url, headers=headers, json=data)
         if r.status_code == 200:
             return r.json()["choices"][0]["message"]["content"]
         else:
             return f"⚠️ OpenRouter error: {r.text}"
 
+    def ask_ai_stream(self, query):
+        # yields content deltas from OpenRouter's SSE stream
+        headers = {
+            "Authorization": f"Bearer {self.or_key}",
+            "Content-Type": "application/json",
+        }
+        data = {
+            "model": "openrouter/auto",
+            "stream": True,
+            "messages": [
+                {"role": "system", "content": "You are a helpful AI assistant inside Telegram."},
+                {"role": "user", "content": query}
+            ]
+        }
+        # read timeout is per chunk: a stream that goes quiet for 60 s is dropped
+        with req.post(self.or_url, headers=headers, json=data,
+                      stream=True, timeout=(10, 60)) as r:
+            if r.status_code != 200:
+                yield f"⚠️ OpenRouter error: {r.text}"
+                return
+            for line in r.iter_lines(decode_unicode=True):
+                # blank keep-alives and ": OPENROUTER PROCESSING" comments are skipped
+                if not line or not line.startswith("data: "):
+                    continue
+                chunk = line[len("data: "):]
+                if chunk == "[DONE]":
+                    return
+                try:
+                    event = json.loads(chunk)
+                except ValueError:
+                    continue
+                if "error" in event:
+                    # mid-stream failures arrive as a data event, still with HTTP 200
+                    raise RuntimeError(event["error"].get("message", event["error"]))
+                choices = event.get("choices") or [{}]
+                delta = (choices[0].get("delta") or {}).get("content")
+                if delta:
+                    yield delta
+
+    def editMessage(self, text, cid, mid):
+        payload = {"chat_id": cid, "message_id": mid, "text": text}
+        return self.outbox.send(f"{self.base_url}/editMessageText", cid, json=payload).result()
+
+    def streamAnswer(self, query, cid, interval=1.5):
+        # edit the answer in as it streams, at most once per interval,
+        # rolling over to a new message at Telegram's 4096 unit limit
+        res = self.sendMessage("🧠 …", cid)
+        if not res.get("ok"):
+            print(f"streamAnswer: placeholder not sent to {cid}: {res.get('description')}")
+            return res
+        mid = res["result"]["message_id"]
+        buf, shown, last = "🧠 ", "", 0
+        try:
+            for delta in self.ask_ai_stream(query):
+                buf += delta
+                while tg_len(buf) > TG_LIMIT:
+                    end = tg_cut(buf, TG_LIMIT)
+                    cut = buf.rfind("\n", 0, end)
+                    if cut < end // 2:
+                        cut = end
+                    self.editMessage(buf[:cut], cid, mid)
+                    buf = buf[cut:].lstrip("\n") or "…"
+                    res = self.sendMessage(buf[:tg_cut(buf, TG_LIMIT)], cid)
+                    if not res.get("ok"):
+                        # what already streamed stays; with no message to edit the rest has nowhere to go
+                        print(f"streamAnswer: rollover not sent to {cid}: {res.get('description')}")
+                        return res
+                    mid = res["result"]["message_id"]
+                    shown, last = buf[:tg_cut(buf, TG_LIMIT)], time.monotonic()
+                if buf != shown and time.monotonic() - last >= interval:
+                    self.editMessage(buf, cid, mid)
+                    shown, last = buf, time.monotonic()
+        except (req.RequestException, RuntimeError) as e:
+            # keep what already streamed, and say the answer was cut short
+            note = f"\n\n⚠️ OpenRouter error: {str(e)[:300]}"
+            buf = buf[:tg_cut(buf, TG_LIMIT - tg_len(note))] + note
+        if buf != shown:
+            self.editMessage(buf, cid, mid)
+
     # ----------------- MENUS -----------------
     def menu4(self):
         return {"inline_keyboard":[
@@ -69,8 +166,7 @@ class TeleBot:
             q = text.replace("/ask", "").strip()
             if not q:
                 return self.sendMessage("❓ Usage: `/ask your question`", cid)
-            ans = self.ask_ai(q)
-            return self.sendMessage("🧠 " + ans, cid)
+            return self.streamAnswer(q, cid)
 
     def callbackHandler(self, data, cid, cbid):
         self.answerCallback(cbid)
@@ -84,15 +180,22 @@ class TeleBot:
     async def run(self):
         print("Bot online with OpenRouter integration 🚀")
         while True:
-            updates=self.getUpdates()
-            if updates["result"]:
-                for u in updates["result"]:
-                    self.offset=u["update_id"]+1
+            try:
+                updates=self.getUpdates()
+            except (req.RequestException, ValueError) as e:
+                print(f"getUpdates failed: {e}")
+                await asyncio.sleep(1)
+                continue
+            for u in updates.get("result") or []:
+                self.offset=u["update_id"]+1
+                try:
                     if "message" in u and "text" in u["message"]:
                         self.messageHandler(u["message"]["text"], u["message"]["chat"]["id"])
                     if "callback_query" in u:
                         cq=u["callback_query"]
                         self.callbackHandler(cq["data"], cq["message"]["chat"]["id"], cq["id"])
+                except Exception as e:
+                    print(f"handler failed on update {u['update_id']}: {e!r}")
 
 
 # ----------------- START -----------------
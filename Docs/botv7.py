@@ -1,115 +1,338 @@
 import requests as req
+import re
 import time
+import asyncio
+import threading
+import bisect
+from itertools import islice
+from webhook import WebhookServer, set_webhook
+from sendqueue import Outbox
+from polling import Poller
+from metrics import Metrics
+
+# live minute statuses: "45", "45+", "90+2", "67'"
+MINUTE = re.compile(r"^\d+(\+\d*)?'?$")
+STORE_DOWN = "⚠️ League data is unavailable right now, try again shortly."
+
+# ---------------- LEAGUE STORE ---------------- #
+# Local copy of one league's fixtures, standings and teams, indexed so the
+# commands never have to go upstream.
+class LeagueStore:
+    def __init__(self, league_id):
+        self.league_id = league_id
+        self.updated_at = None
+        self.teams_by_id = {}
+        self.names = []  # sorted (lowercase name, team_key) for prefix lookups
+        self.fixtures_by_team = {}
+        self.fixtures_by_date = {}
+        self.fixtures = []
+        self.dates = {}  # None (all fixtures) or team_key -> event dates, parallel to the fixture list
+        self.standings = []
+        self.lock = threading.Lock()
+
+    def ingest(self, fixtures, standings, teams):
+        fixtures = sorted(fixtures, key=lambda m: (m["event_date"], m["event_time"]))
+        teams_by_id = {str(t["team_key"]): t for t in teams}
+        names = sorted((t["team_name"].lower(), str(t["team_key"])) for t in teams)
+        by_team, by_date = {}, {}
+        for m in fixtures:
+            by_team.setdefault(str(m.get("home_team_key")), []).append(m)
+            by_team.setdefault(str(m.get("away_team_key")), []).append(m)
+            by_date.setdefault(m["event_date"], []).append(m)
+        dates = {None: [m["event_date"] for m in fixtures]}
+        for key, ms in by_team.items():
+            dates[key] = [m["event_date"] for m in ms]
+        with self.lock:
+            self.fixtures = fixtures
+            self.dates = dates
+            self.standings = standings
+            self.teams_by_id = teams_by_id
+            self.names = names
+            self.fixtures_by_team = by_team
+            self.fixtures_by_date = by_date
+            self.updated_at = time.time()
+
+    def find_team(self, query):
+        # team id, or case-insensitive prefix of the team name
+        query = query.strip().lower()
+        with self.lock:
+            if query in self.teams_by_id:
+                return self.teams_by_id[query]
+            i = bisect.bisect_left(self.names, (query, ""))
+            if i < len(self.names) and self.names[i][0].startswith(query):
+                return self.teams_by_id[self.names[i][1]]
+        return None
+
+    def upcoming(self, team_key=None, limit=5, today=None):
+        # fixtures are sorted by date: bisect to today, then skip today's finished games
+        today = today or time.strftime("%Y-%m-%d")
+        key = str(team_key) if team_key else None
+        with self.lock:
+            fixtures = self.fixtures_by_team.get(key, []) if key else self.fixtures
+            i = bisect.bisect_left(self.dates.get(key, []), today)
+            return list(islice((m for m in fixtures[i:] if m.get("event_status") != "Finished"), limit))
+
+    def on_date(self, date):
+        with self.lock:
+            return list(self.fixtures_by_date.get(date, []))
+
+    def age(self):
+        return f"Updated {int((time.time() - self.updated_at) // 60)} min ago"
 
 class TeleBot:
-    def __init__(self, token, sports_api_key):
+    def __init__(self, token, sports_api_key, live_interval=30, league_id=152, store_interval=900,
+                 metrics_port=None, metrics_file=None):
         self.token = token
+        self.metrics = Metrics()
+        self.metrics_port = metrics_port
+        self.metrics_file = metrics_file
+        self.outbox = Outbox(metrics=self.metrics)
         self.sports_api_key = sports_api_key
+        # latest livescore snapshot, refreshed by pollLive in the background
+        self.live_interval = live_interval
+        self.live = {}
+        self.live_at = None
+        self.follows = {}  # lowercase team name -> set of chat ids
+        self.live_lock = threading.Lock()
+        self.league_id = league_id  # 152 = Premier League as example
+        self.store_interval = store_interval
+        self.store = LeagueStore(league_id)
+        self.other_teams = {}  # team id -> (fetched_at, team or None) for teams outside league_id
 
     def __str__(self):
         return f"Bot with token {self.token} added successfully."
 
     # Telegram API wrappers
-    def getUpdates(self, offset=None):
-        payload = {"offset": offset, "timeout": 30}
-        return req.get(f"{self.token}/getUpdates", params=payload).json()
+    def getUpdates(self, offset=None, timeout=30):
+        payload = {"offset": offset, "timeout": timeout}
+        return req.get(f"{self.token}/getUpdates", params=payload, timeout=timeout + 10).json()
 
     def sendMessage(self, text, cid):
         payload = {"text": text, "chat_id": cid}
-        return req.get(f"{self.token}/sendMessage", params=payload).json()
+        return self.outbox.send(f"{self.token}/sendMessage", cid, data=payload).result()
 
     # ---------------- SPORTS API ---------------- #
-    def getLiveScores(self):
+    def fetchLive(self):
         url = f"https://allsportsapi.com/api/football/?met=Livescore&APIkey={self.sports_api_key}"
         res = req.get(url).json()
-        if "result" not in res or not res["result"]:
+        matches = res.get("result") or []
+        return {m.get("event_key") or f"{m['event_home_team']}-{m['event_away_team']}": m for m in matches}
+
+    def diffLive(self, old, new):
+        events = []
+        for key, m in new.items():
+            o = old.get(key)
+            if o is None:
+                continue
+            match = f"{m['event_home_team']} vs {m['event_away_team']}"
+            if o["event_final_result"] != m["event_final_result"]:
+                events.append((m, f"⚽ GOAL! {match}\nScore: {m['event_final_result']} ⏱ {m['event_status']}"))
+            elif o["event_status"] != m["event_status"] and not MINUTE.match(m["event_status"].strip()):
+                # minute ticks (stoppage time included) are noise, only report HT/FT style changes
+                events.append((m, f"📣 {match}: {m['event_status']}\nScore: {m['event_final_result']}"))
+        return events
+
+    def refreshLive(self):
+        new = self.fetchLive()
+        with self.live_lock:
+            old = self.live
+            self.live = new
+            self.live_at = time.time()
+        for m, msg in self.diffLive(old, new):
+            for cid in self.followers(m):
+                self.outbox.send(f"{self.token}/sendMessage", cid, data={"text": msg, "chat_id": cid})
+
+    def followers(self, match):
+        home = match["event_home_team"].lower()
+        away = match["event_away_team"].lower()
+        with self.live_lock:
+            return set().union(*[cids for team, cids in self.follows.items() if team in home or team in away])
+
+    def pollLive(self):
+        while True:
+            try:
+                self.refreshLive()
+            except Exception as e:
+                print(f"Live score refresh failed: {e}")
+            time.sleep(self.live_interval)
+
+    def startLive(self):
+        threading.Thread(target=self.pollLive, daemon=True).start()
+        threading.Thread(target=self.pollStore, daemon=True).start()
+
+    def follow(self, team, cid):
+        with self.live_lock:
+            self.follows.setdefault(team.lower(), set()).add(cid)
+
+    def getLiveScores(self):
+        # served from the background snapshot, no upstream call
+        with self.live_lock:
+            matches = list(self.live.values())
+            live_at = self.live_at
+        if not matches:
             return "No live matches right now ⚽"
         msg = "🔥 Live Matches:\n\n"
-        for match in res["result"][:5]:  # limit to 5
+        for match in matches[:5]:  # limit to 5
             home = match["event_home_team"]
             away = match["event_away_team"]
             score = match["event_final_result"]
             time_ = match["event_status"]
             msg += f"{home} vs {away}\nScore: {score} ⏱ {time_}\n\n"
+        msg += f"Updated {int(time.time() - live_at)}s ago"
         return msg
 
-    def getFixtures(self, league_id=152):  # 152 = Premier League as example
-        url = f"https://allsportsapi.com/api/football/?met=Fixtures&leagueId={league_id}&APIkey={self.sports_api_key}"
-        res = req.get(url).json()
-        if "result" not in res or not res["result"]:
+    def fetchSports(self, met, **params):
+        query = "".join(f"&{k}={v}" for k, v in params.items())
+        url = f"https://allsportsapi.com/api/football/?met={met}{query}&APIkey={self.sports_api_key}"
+        return req.get(url).json().get("result") or []
+
+    def refreshStore(self):
+        lid = self.league_id
+        standings = self.fetchSports("Standings", leagueId=lid)
+        self.store.ingest(
+            self.fetchSports("Fixtures", leagueId=lid),
+            standings[0]["standing"] if standings else [],
+            self.fetchSports("Teams", leagueId=lid),
+        )
+
+    def pollStore(self):
+        while True:
+            time.sleep(self.store_interval)
+            try:
+                self.refreshStore()
+            except Exception as e:
+                print(f"League store refresh failed: {e}")
+
+    def ensureStore(self):
+        # False (and logged) when the first refresh fails, so handlers can still answer
+        if self.store.updated_at is None:
+            try:
+                self.refreshStore()
+            except Exception as e:
+                print(f"League store refresh failed: {e}")
+                return False
+        return True
+
+    def lookupTeam(self, team_id):
+        # /team <id> for a team the league store doesn't hold: the upstream lookup, cached
+        hit = self.other_teams.get(team_id)
+        if hit and time.time() - hit[0] < self.store_interval:
+            return hit[1]
+        res = self.fetchSports("Teams", teamId=team_id)
+        team = res[0] if res else None
+        if len(self.other_teams) >= 1024:
+            self.other_teams.clear()
+        self.other_teams[team_id] = (time.time(), team)
+        return team
+
+    def getFixtures(self, team=None):
+        if not self.ensureStore():
+            return STORE_DOWN
+        if team and team[:4].isdigit() and team[4:5] == "-":
+            fixtures = self.store.on_date(team)
+            title = f"📅 Fixtures on {team}:"
+        elif team:
+            t = self.store.find_team(team)
+            if not t:
+                return "Team not found ❌"
+            fixtures = self.store.upcoming(t["team_key"])
+            title = f"📅 Upcoming Fixtures for {t['team_name']}:"
+        else:
+            fixtures = self.store.upcoming()
+            title = "📅 Upcoming Fixtures:"
+        if not fixtures:
             return "No upcoming fixtures found ⚽"
-        msg = "📅 Upcoming Fixtures:\n\n"
-        for match in res["result"][:5]:
+        msg = title + "\n\n"
+        for match in fixtures:
             home = match["event_home_team"]
             away = match["event_away_team"]
             date = match["event_date"]
             time_ = match["event_time"]
             msg += f"{date} {time_} → {home} vs {away}\n"
-        return msg
+        return msg + f"\n{self.store.age()}"
 
-    def getStandings(self, league_id=152):
-        url = f"https://allsportsapi.com/api/football/?met=Standings&leagueId={league_id}&APIkey={self.sports_api_key}"
-        res = req.get(url).json()
-        if "result" not in res or not res["result"]:
+    def getStandings(self):
+        if not self.ensureStore():
+            return STORE_DOWN
+        if not self.store.standings:
             return "Standings not available 🏆"
         msg = "🏆 League Standings:\n\n"
-        for team in res["result"][0]["standing"][:10]:  # top 10
+        for team in self.store.standings[:10]:  # top 10
             pos = team["standing_place"]
             name = team["standing_team"]
             pts = team["standing_PTS"]
             msg += f"{pos}. {name} - {pts} pts\n"
-        return msg
+        return msg + f"\n{self.store.age()}"
 
-    def getTeam(self, team_id):
-        url = f"https://allsportsapi.com/api/football/?met=Teams&teamId={team_id}&APIkey={self.sports_api_key}"
-        res = req.get(url).json()
-        if "result" not in res or not res["result"]:
-            return "Team info not found ❌"
-        t = res["result"][0]
+    def getTeam(self, query):
+        stored = self.ensureStore()
+        t = self.store.find_team(query) if stored else None
+        footer = f"\n\n{self.store.age()}" if t else ""
+        if not t and query.strip().isdigit():
+            try:
+                t = self.lookupTeam(query.strip())
+            except Exception as e:
+                print(f"Team lookup failed: {e}")
+                return "⚠️ Couldn't reach the sports API, try again shortly."
+        if not t:
+            return "Team info not found ❌" if stored else STORE_DOWN
         msg = f"⚽ {t['team_name']}\nFounded: {t.get('team_founded','N/A')}\nCountry: {t.get('team_country','N/A')}\nStadium: {t.get('team_stadium','N/A')}"
-        return msg
+        return msg + footer
 
     # ---------------- MESSAGE HANDLER ---------------- #
     def messageHandler(self, text, cid):
         # Sports
         if text == "/sports":
-            return self.sendMessage("⚽ Sports Menu:\n/live → Live scores\n/fixtures → Upcoming matches\n/table → League standings\n/team <id> → Team info", cid)
+            return self.sendMessage("⚽ Sports Menu:\n/live → Live scores\n/fixtures [team|YYYY-MM-DD] → Upcoming matches\n/table → League standings\n/team <id or name> → Team info\n/follow <team> → Goal alerts", cid)
 
         if text == "/live":
             return self.sendMessage(self.getLiveScores(), cid)
 
         if text.startswith("/fixtures"):
-            return self.sendMessage(self.getFixtures(), cid)
+            parts = text.split(maxsplit=1)
+            return self.sendMessage(self.getFixtures(parts[1] if len(parts) == 2 else None), cid)
 
         if text.startswith("/table"):
             return self.sendMessage(self.getStandings(), cid)
 
         if text.startswith("/team"):
-            parts = text.split()
+            parts = text.split(maxsplit=1)
+            if len(parts) == 2:
+                return self.sendMessage(self.getTeam(parts[1]), cid)
+            else:
+                return self.sendMessage("Usage: /team <id or name>", cid)
+
+        if text.startswith("/follow"):
+            parts = text.split(maxsplit=1)
             if len(parts) == 2:
-                team_id = parts[1]
-                return self.sendMessage(self.getTeam(team_id), cid)
+                self.follow(parts[1].strip(), cid)
+                return self.sendMessage(f"🔔 Following {parts[1].strip()} — you'll get goals and status changes.", cid)
             else:
-                return self.sendMessage("Usage: /team <team_id>", cid)
+                return self.sendMessage("Usage: /follow <team>", cid)
 
         # Default
         if text == "/start":
             return self.sendMessage("Welcome to Coding Wizard Bot 🧙\nUse /sports for sports features ⚽", cid)
 
     # ---------------- BOT RUN LOOP ---------------- #
+    def handleUpdate(self, update):
+        cid = update["message"]["chat"]["id"]
+        text = update["message"].get("text", "")
+        print(update)
+        self.messageHandler(text, cid)
+
     def run(self):
-        offset = None
         print("Bot is running....")
-        while True:
-            updates = self.getUpdates(offset)
-            if updates["result"]:
-                for update in updates["result"]:
-                    offset = update["update_id"] + 1
-                    cid = update["message"]["chat"]["id"]
-                    text = update["message"].get("text", "")
-                    print(update)
-                    self.messageHandler(text, cid)
-            time.sleep(1)
+        self.startLive()
+        self.metrics.export(self.metrics_port, self.metrics_file)
+        self.poller = Poller(self.getUpdates, self.handleUpdate, metrics=self.metrics)
+        self.poller.run()
+
+    def run_webhook(self, url, secret, port=8443):
+        print(set_webhook(self.token, url, secret))
+        self.metrics.export(self.metrics_port, self.metrics_file)
+        self.startLive()
+        asyncio.run(WebhookServer(self.handleUpdate, secret, port=port, metrics=self.metrics).serve())
 
 
 # ---------------- RUN BOT ---------------- #
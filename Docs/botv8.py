@@ -1,72 +1,183 @@
 import requests as req
 import yt_dlp
+import asyncio
+import multiprocessing
+import re
+import threading
 import time
+from collections import OrderedDict
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from webhook import WebhookServer, set_webhook
+from sendqueue import Outbox
+from polling import Poller
+from metrics import Metrics
+
+# ------------------------
+# Extractor worker processes: each keeps its YoutubeDL instances for life.
+# Listing uses flat extraction; stream formats are only resolved on /download.
+search_ydl = None
+resolve_ydl = None
+
+def init_extractor():
+    global search_ydl, resolve_ydl
+    search_ydl = yt_dlp.YoutubeDL({"extract_flat": "in_playlist", "quiet": True, "noplaylist": True})
+    resolve_ydl = yt_dlp.YoutubeDL({"format": "bestaudio/best", "quiet": True, "noplaylist": True})
+
+def flat_entry(v):
+    thumbs = v.get("thumbnails") or []
+    return {
+        "id": v["id"],
+        "title": v.get("title"),
+        "url": f"https://www.youtube.com/watch?v={v['id']}",
+        "thumbnail": thumbs[-1]["url"] if thumbs else f"https://i.ytimg.com/vi/{v['id']}/hqdefault.jpg",
+    }
+
+def extract(ydl, url):
+    # yt-dlp errors carry unpicklable loggers, send back plain ones
+    try:
+        return ydl.extract_info(url, download=False)
+    except yt_dlp.utils.DownloadError as e:
+        raise RuntimeError(str(e)) from None
+
+def search_job(query, max_results):
+    results = extract(search_ydl, f"ytsearch{max_results}:{query}")["entries"]
+    return [flat_entry(v) for v in results]
+
+def resolve_job(url):
+    info = extract(resolve_ydl, url)
+    return {
+        "id": info["id"],
+        "title": info["title"],
+        "audio": info["url"],
+        "thumbnail": info.get("thumbnail")
+    }
+
+# ------------------------
+# Resolved stream URLs by video id. googlevideo URLs carry their own expiry
+# (expire=<unix time>), entries are dropped a margin before that.
+VIDEO_ID = re.compile(r"(?:v=|youtu\.be/|shorts/|embed/)([\w-]{11})")
+EXPIRE = re.compile(r"[?&/]expire[=/](\d+)")
+
+def video_id(url):
+    m = VIDEO_ID.search(url)
+    return m.group(1) if m else None
+
+def stream_expiry(url):
+    m = EXPIRE.search(url or "")
+    return int(m.group(1)) if m else None
+
+class StreamCache:
+    def __init__(self, margin=120, default_ttl=3600, maxsize=2048):
+        self.margin = margin
+        self.default_ttl = default_ttl
+        self.maxsize = maxsize
+        self.items = OrderedDict()  # video id -> (expires, song)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, vid):
+        with self.lock:
+            entry = self.items.get(vid)
+            if entry and entry[0] - self.margin > time.time():
+                self.items.move_to_end(vid)
+                self.hits += 1
+                return entry[1]
+            if entry:
+                del self.items[vid]
+            self.misses += 1
+            return None
+
+    def put(self, song):
+        expires = stream_expiry(song["audio"]) or time.time() + self.default_ttl
+        with self.lock:
+            self.items[song["id"]] = (expires, song)
+            self.items.move_to_end(song["id"])
+            while len(self.items) > self.maxsize:
+                self.items.popitem(last=False)
 
 class YouTubeBot:
-    def __init__(self, token):
+    def __init__(self, token, extractors=4, metrics_port=None, metrics_file=None):
         self.token = token
+        self.metrics = Metrics()
+        self.metrics_port = metrics_port
+        self.metrics_file = metrics_file
+        self.outbox = Outbox(metrics=self.metrics)
+        # spawned, not forked: workers start lazily from the job threads, and forking a process
+        # with live threads (outbox senders, poller) can copy a held lock into the child
+        self.extractors = ProcessPoolExecutor(max_workers=extractors, initializer=init_extractor,
+                                              mp_context=multiprocessing.get_context("spawn"))
+        # yt-dlp commands run here so a slow one never holds up the poll loop
+        self.jobs = ThreadPoolExecutor(max_workers=extractors * 2)
+        self.streams = StreamCache()
 
     # Telegram Helpers
     def sendMessage(self, text, cid):
         payload = {"chat_id": cid, "text": text}
-        return req.post(f"{self.token}/sendMessage", data=payload).json()
+        return self.outbox.send(f"{self.token}/sendMessage", cid, data=payload).result()
 
     def sendPhoto(self, photo_url, cid, caption=""):
         payload = {"chat_id": cid, "photo": photo_url, "caption": caption}
-        return req.post(f"{self.token}/sendPhoto", data=payload).json()
+        return self.outbox.send(f"{self.token}/sendPhoto", cid, data=payload).result()
 
     def sendAudio(self, audio_url, cid, title=""):
         payload = {"chat_id": cid, "audio": audio_url, "title": title}
-        return req.post(f"{self.token}/sendAudio", data=payload).json()
+        return self.outbox.send(f"{self.token}/sendAudio", cid, data=payload).result()
 
     # Telegram Updates
-    def getUpdates(self, offset=None):
-        payload = {"offset": offset, "timeout": 30}
-        return req.get(f"{self.token}/getUpdates", params=payload).json()
+    def getUpdates(self, offset=None, timeout=30):
+        payload = {"offset": offset, "timeout": timeout}
+        return req.get(f"{self.token}/getUpdates", params=payload, timeout=timeout + 10).json()
 
     # ------------------------
     # YT-dlp Functions
     def ytSearch(self, query, max_results=3):
-        ydl_opts = {"format": "bestaudio/best", "noplaylist": True}
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            results = ydl.extract_info(f"ytsearch{max_results}:{query}", download=False)['entries']
-            videos = []
-            for v in results:
-                videos.append({
-                    "title": v["title"],
-                    "url": v["webpage_url"],
-                    "audio": v["url"],
-                    "thumbnail": v["thumbnail"]
-                })
-            return videos
-
-    def ytPlaylist(self, url):
-        ydl_opts = {"format": "bestaudio/best", "noplaylist": False}
+        return self.extractors.submit(search_job, query, max_results).result()
+
+    def ytPlaylist(self, url, start=0, cap=50):
+        # lazy, flat walk of the playlist: entries come out as yt-dlp reads each page
+        ydl_opts = {"extract_flat": "in_playlist", "quiet": True, "noplaylist": False}
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=False)
-            videos = []
-            for v in info["entries"]:
-                videos.append({
-                    "title": v["title"],
-                    "url": v["webpage_url"],
-                    "audio": v["url"],
-                    "thumbnail": v["thumbnail"]
-                })
-            return videos
+            info = ydl.extract_info(url, download=False, process=False)
+            # playlist URLs can redirect to the real tab first
+            while info.get("_type") == "url":
+                info = ydl.extract_info(info["url"], download=False, process=False)
+            entries = islice(info.get("entries") or [], start, start + cap if cap else None)
+            for v in entries:
+                if v.get("id"):
+                    yield flat_entry(v)
 
     def ytDownload(self, url):
-        ydl_opts = {"format": "bestaudio/best"}
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=False)
-            return {
-                "title": info["title"],
-                "audio": info["url"],
-                "thumbnail": info.get("thumbnail")
-            }
+        vid = video_id(url)
+        song = self.streams.get(vid) if vid else None
+        if song is None:
+            song = self.extractors.submit(resolve_job, url).result()
+            self.streams.put(song)
+        return song
 
     # ------------------------
     # Bot Message Handler
     def handleMessage(self, text, cid):
+        if text.startswith(("/search", "/playlist", "/download")):
+            return self.jobs.submit(self.handleYt, text, cid)
+
+        if text.startswith("/help"):
+            help_text = (
+                "/search <query> → Search YouTube videos\n"
+                "/playlist <URL> [from] → List playlist videos\n"
+                "/download <URL> → Download audio (YT-dlp)\n"
+            )
+            return self.sendMessage(help_text, cid)
+
+    def handleYt(self, text, cid):
+        try:
+            return self.handleYtCommand(text, cid)
+        except Exception as e:
+            print(f"yt-dlp command failed: {e}")
+            return self.sendMessage("⚠️ Couldn't fetch that from YouTube, try again.", cid)
+
+    def handleYtCommand(self, text, cid):
         if text.startswith("/search"):
             query = text.split(maxsplit=1)[1]
             videos = self.ytSearch(query)
@@ -75,12 +186,10 @@ class YouTubeBot:
             return
 
         if text.startswith("/playlist"):
-            url = text.split(maxsplit=1)[1]
-            videos = self.ytPlaylist(url)
-            msg = f"Playlist has {len(videos)} videos:\n\n"
-            for v in videos[:10]:
-                msg += f"{v['title']}\n{v['url']}\n\n"
-            return self.sendMessage(msg, cid)
+            parts = text.split()
+            url = parts[1]
+            start = int(parts[2]) if len(parts) > 2 else 0
+            return self.streamPlaylist(url, start, cid)
 
         if text.startswith("/download"):
             url = text.split(maxsplit=1)[1]
@@ -89,32 +198,47 @@ class YouTubeBot:
                 self.sendPhoto(song["thumbnail"], cid, caption=f"🎵 {song['title']}")
             return self.sendAudio(song["audio"], cid, title=song["title"])
 
-        if text.startswith("/help"):
-            help_text = (
-                "/search <query> → Search YouTube videos\n"
-                "/playlist <URL> → Get playlist info\n"
-                "/download <URL> → Download audio (YT-dlp)\n"
-            )
-            return self.sendMessage(help_text, cid)
+    def streamPlaylist(self, url, start, cid, cap=50, chunk=10):
+        # send entries in chunks as they arrive, only one chunk held at a time
+        n = start
+        batch = []
+        for v in self.ytPlaylist(url, start, cap):
+            batch.append(f"{n + 1}. {v['title']}\n{v['url']}")
+            n += 1
+            if len(batch) == chunk:
+                self.sendMessage("\n\n".join(batch), cid)
+                batch = []
+        if batch:
+            self.sendMessage("\n\n".join(batch), cid)
+        if n == start:
+            return self.sendMessage("No videos found in that playlist.", cid)
+        if n - start == cap:
+            return self.sendMessage(f"Showing {start + 1}–{n}. More: /playlist {url} {n}", cid)
+        return self.sendMessage(f"Playlist has {n} videos.", cid)
 
     # ------------------------
     # Run Bot
+    def handleUpdate(self, update):
+        message = update["message"]
+        cid = message["chat"]["id"]
+        text = message.get("text", "")
+        print(f"Received: {text}")
+        self.handleMessage(text, cid)
+
     def run(self):
-        offset = None
         print("YouTubeBot running...")
-        while True:
-            updates = self.getUpdates(offset)
-            if updates["result"]:
-                for update in updates["result"]:
-                    offset = update["update_id"] + 1
-                    message = update["message"]
-                    cid = message["chat"]["id"]
-                    text = message.get("text", "")
-                    print(f"Received: {text}")
-                    self.handleMessage(text, cid)
-            time.sleep(1)
+        self.metrics.export(self.metrics_port, self.metrics_file)
+        self.poller = Poller(self.getUpdates, self.handleUpdate, metrics=self.metrics)
+        self.poller.run()
+
+    def run_webhook(self, url, secret, port=8443):
+        print(set_webhook(self.token, url, secret))
+        self.metrics.export(self.metrics_port, self.metrics_file)
+        asyncio.run(WebhookServer(self.handleUpdate, secret, port=port, metrics=self.metrics).serve())
 
 # ------------------------
 # Initialize Bot
-bot = YouTubeBot("https://api.telegram.org/bot8016088849:AAG_kMh8ioaMHe6_Fq12hixbwRYF5hX-8I0")
-bot.run()
\ No newline at end of file
+if __name__ == "__main__":
+    # guarded so extractor processes importing this module don't start a bot
+    bot = YouTubeBot("https://api.telegram.org/bot8016088849:AAG_kMh8ioaMHe6_Fq12hixbwRYF5hX-8I0")
+    bot.run()
\ No newline at end of file
@@ -1,16 +1,20 @@
 import requests as req
+import asyncio
+from webhook import WebhookServer, set_webhook
+from sendqueue import Outbox
 
 class TeleBot:
     def __init__(self, token):
         self.token = token
+        self.outbox = Outbox()
 
     def sendMessage(self, text, cid):
         payload = {"chat_id": cid, "text": text}
-        return req.post(f"{self.token}/sendMessage", data=payload).json()
+        return self.outbox.send(f"{self.token}/sendMessage", cid, data=payload).result()
 
     def sendPhoto(self, photo_url, cid, caption=""):
         payload = {"chat_id": cid, "photo": photo_url, "caption": caption}
-        return req.post(f"{self.token}/sendPhoto", data=payload).json()
+        return self.outbox.send(f"{self.token}/sendPhoto", cid, data=payload).result()
 
     def getUpdates(self, offset=None):
         payload = {"offset": offset, "timeout": 30}
@@ -47,6 +51,13 @@ class TeleBot:
         if text.startswith("/help"):
             return self.sendMessage("/user → Get a random user profile", cid)
 
+    def handleUpdate(self, update):
+        message = update["message"]
+        cid = message["chat"]["id"]
+        text = message.get("text", "")
+        print(f"Received: {text}")
+        self.handleMessage(text, cid)
+
     def run(self):
         offset = None
         print("Bot is running...")
@@ -55,11 +66,11 @@ class TeleBot:
             if updates["result"]:
                 for update in updates["result"]:
                     offset = update["update_id"] + 1
-                    message = update["message"]
-                    cid = message["chat"]["id"]
-                    text = message.get("text", "")
-                    print(f"Received: {text}")
-                    self.handleMessage(text, cid)
+                    self.handleUpdate(update)
+
+    def run_webhook(self, url, secret, port=8443):
+        print(set_webhook(self.token, url, secret))
+        asyncio.run(WebhookServer(self.handleUpdate, secret, port=port).serve())
 
 # Run bot
 bot = TeleBot("https://api.telegram.org/bot8016088849:AAG_kMh8ioaMHe6_Fq12hixbwRYF5hX-8I0")
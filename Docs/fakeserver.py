@@ -0,0 +1,87 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+# Local stand-in for Telegram and the upstream APIs, used by the bench_*.py
+# scripts. routes maps a path suffix to fn(params) -> (status, payload); every
+# request is counted per route. Keep-alive is on, so pooled clients reuse sockets.
+class FakeServer:
+    def __init__(self, routes, host="127.0.0.1", port=0, ssl_context=None):
+        self.routes = routes
+        self.counts = {}
+        self.lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                server.handle(self)
+
+            do_POST = do_GET
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        if ssl_context:
+            self.httpd.socket = ssl_context.wrap_socket(self.httpd.socket, server_side=True)
+        scheme = "https" if ssl_context else "http"
+        self.url = f"{scheme}://{host}:{self.httpd.server_address[1]}"
+
+    def handle(self, h):
+        parts = urlsplit(h.path)
+        params = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+        length = int(h.headers.get("Content-Length") or 0)
+        body = h.rfile.read(length) if length else b""
+        if body and h.headers.get("Content-Type", "").startswith("application/json"):
+            params.update(json.loads(body))
+        elif body:
+            params.update({k: v[-1] for k, v in parse_qs(body.decode()).items()})
+
+        route = next((r for r in self.routes if parts.path.endswith(r)), None)
+        with self.lock:
+            self.counts[route] = self.counts.get(route, 0) + 1
+        status, payload = self.routes[route](params) if route else (404, {"ok": False})
+
+        data = json.dumps(payload).encode()
+        h.send_response(status)
+        h.send_header("Content-Type", "application/json")
+        h.send_header("Content-Length", str(len(data)))
+        h.end_headers()
+        h.wfile.write(data)
+
+    def count(self, route):
+        with self.lock:
+            return self.counts.get(route, 0)
+
+    def wait_for(self, route, n, timeout=60):
+        deadline = time.monotonic() + timeout
+        while self.count(route) < n and time.monotonic() < deadline:
+            time.sleep(0.001)
+        return self.count(route) >= n
+
+    def start(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def slow(seconds, payload, status=200):
+    # route that answers after a fixed delay
+    def route(params):
+        time.sleep(seconds)
+        return status, payload
+    return route
+
+
+def telegram_ok(params):
+    return 200, {"ok": True, "result": {"message_id": 1, "chat": {"id": params.get("chat_id")}}}
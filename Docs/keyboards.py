@@ -0,0 +1,49 @@
+import json
+
+
+# Static inline keyboards, encoded to JSON once at startup. Senders splice the
+# stored text straight into the request body instead of re-serializing dicts.
+class KeyboardRegistry:
+    def __init__(self):
+        self.encoded = {}
+        self.decoded = {}
+
+    def add(self, name, rows):
+        self.decoded[name] = {"inline_keyboard": rows}
+        self.encoded[name] = json.dumps(self.decoded[name], ensure_ascii=False, separators=(",", ":"))
+        return self.encoded[name]
+
+    def matches(self, name, markup):
+        # True if a message's current reply_markup already is this keyboard
+        return self.decoded.get(name) == markup
+
+    def add_pages(self, prefix, actions, cols=2, rows=3, back="⏮ Back", next="⏭ Next"):
+        # actions is a flat list of (text, callback_data); pages are named prefix1..prefixN
+        per_page = cols * rows
+        chunks = [actions[i:i + per_page] for i in range(0, len(actions), per_page)]
+        names = []
+        for n, chunk in enumerate(chunks, start=1):
+            grid = [[{"text": t, "callback_data": d} for t, d in chunk[i:i + cols]]
+                    for i in range(0, len(chunk), cols)]
+            nav = []
+            if n > 1:
+                nav.append({"text": back, "callback_data": f"{prefix}{n - 1}"})
+            if n < len(chunks):
+                nav.append({"text": next, "callback_data": f"{prefix}{n + 1}"})
+            if nav:
+                grid.append(nav)
+            names.append(f"{prefix}{n}")
+            self.add(names[-1], grid)
+        return names
+
+    def __getitem__(self, name):
+        return self.encoded[name]
+
+    def get(self, name, default=None):
+        return self.encoded.get(name, default)
+
+
+def splice_markup(payload, markup):
+    # payload dict + pre-encoded reply_markup -> JSON request body
+    body = json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+    return (body[:-1] + ',"reply_markup":' + markup + "}").encode()
@@ -0,0 +1,143 @@
+import asyncio
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# log-spaced bucket bounds from 0.1 ms to ~100 s; observe() is one bisect + add
+BOUNDS = [0.0001 * 1.25 ** i for i in range(63)]
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BOUNDS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BOUNDS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def quantile(self, q):
+        # upper bound of the bucket holding the q-th observation (~25% resolution)
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank:
+                return BOUNDS[i] if i < len(BOUNDS) else BOUNDS[-1]
+        return BOUNDS[-1]
+
+
+# In-process timing registry: histograms keyed by (name, label), plus a few
+# point-in-time gauges (queue depths), exported as Prometheus text or JSON.
+class Metrics:
+    def __init__(self, prefix="telebot"):
+        self.prefix = prefix
+        self.hists = {}
+        self.gauges = {}  # (name, label) -> last value set
+        self.lock = threading.Lock()
+
+    def observe(self, name, label, seconds):
+        with self.lock:
+            h = self.hists.get((name, label))
+            if h is None:
+                h = self.hists[(name, label)] = Histogram()
+            h.observe(seconds)
+
+    def gauge(self, name, label, value):
+        with self.lock:
+            self.gauges[(name, label)] = value
+
+    @contextmanager
+    def timer(self, name, label=""):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, label, time.perf_counter() - start)
+
+    def snapshot(self):
+        with self.lock:
+            out = {}
+            for (name, label), h in self.hists.items():
+                out.setdefault(name, {})[label] = {
+                    "count": h.count,
+                    "sum": round(h.sum, 6),
+                    "p50": round(h.quantile(0.5), 6),
+                    "p95": round(h.quantile(0.95), 6),
+                    "p99": round(h.quantile(0.99), 6),
+                }
+            return out
+
+    def gauge_snapshot(self):
+        with self.lock:
+            out = {}
+            for (name, label), value in self.gauges.items():
+                out.setdefault(name, {})[label] = value
+            return out
+
+    def prometheus(self):
+        lines = []
+        for name, labels in sorted(self.gauge_snapshot().items()):
+            metric = f"{self.prefix}_{name}"
+            lines.append(f"# TYPE {metric} gauge")
+            for label, value in sorted(labels.items()):
+                tag = f'{{label="{label}"}}' if label else ""
+                lines.append(f"{metric}{tag} {value}")
+        for name, labels in sorted(self.snapshot().items()):
+            metric = f"{self.prefix}_{name}_seconds"
+            lines.append(f"# TYPE {metric} summary")
+            for label, s in sorted(labels.items()):
+                tag = f'label="{label}",' if label else ""
+                for q in ("p50", "p95", "p99"):
+                    lines.append(f'{metric}{{{tag}quantile="0.{q[1:]}"}} {s[q]}')
+                tag = f'{{label="{label}"}}' if label else ""
+                lines.append(f"{metric}_count{tag} {s['count']}")
+                lines.append(f"{metric}_sum{tag} {s['sum']}")
+        return "\n".join(lines) + "\n"
+
+    # ----------------- EXPORT -----------------
+    def dump_json(self, path):
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"time": time.time(), "metrics": self.snapshot(), "gauges": self.gauge_snapshot()}, f, indent=2)
+        os.replace(tmp, path)
+
+    async def dump_loop(self, path, interval=60):
+        while True:
+            await asyncio.sleep(interval)
+            self.dump_json(path)
+
+    async def handle_scrape(self, reader, writer):
+        try:
+            await reader.readuntil(b"\r\n\r\n")
+            body = self.prometheus().encode()
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/plain; version=0.0.4\r\n"
+                         + f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+            await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=9100):
+        # answers any GET with the Prometheus text page. There is no auth and the
+        # labels name commands, so it stays on loopback unless a host is given
+        return await asyncio.start_server(self.handle_scrape, host, port)
+
+    def export(self, port=None, path=None, host="127.0.0.1"):
+        # for threaded bots with no event loop: serve/dump from a daemon thread
+        if not port and not path:
+            return
+        loop = asyncio.new_event_loop()
+        if port:
+            loop.run_until_complete(self.serve(host, port))
+        if path:
+            loop.create_task(self.dump_loop(path))
+        threading.Thread(target=loop.run_forever, daemon=True).start()
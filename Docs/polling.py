@@ -0,0 +1,51 @@
+import random
+import time
+
+from metrics import Metrics
+
+
+# getUpdates loop without a fixed sleep: a non-empty batch loops straight back,
+# an idle bot waits inside Telegram's long poll, and network errors back off
+# exponentially with full jitter.
+class Poller:
+    def __init__(self, get_updates, handle_update, timeout=30, base_delay=1, max_delay=60, metrics=None):
+        self.get_updates = get_updates
+        self.handle_update = handle_update
+        self.timeout = timeout
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.metrics = metrics or Metrics()
+        self.offset = None
+        self.failures = 0
+
+    def backoff(self, retry_after=None):
+        self.failures += 1
+        delay = retry_after or random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (self.failures - 1)))
+        self.metrics.observe("poll_backoff", "", delay)
+        time.sleep(delay)
+
+    def poll_once(self):
+        start = time.perf_counter()
+        try:
+            res = self.get_updates(self.offset, self.timeout)
+        except Exception as e:
+            print(f"getUpdates failed: {e}")
+            return self.backoff()
+        if not res.get("ok", True) or "result" not in res:
+            print(f"getUpdates error: {res.get('description')}")
+            return self.backoff(res.get("parameters", {}).get("retry_after"))
+        self.failures = 0
+        updates = res["result"]
+        self.metrics.observe("poll_wait", "batch" if updates else "idle", time.perf_counter() - start)
+        for update in updates:
+            self.offset = update["update_id"] + 1
+            try:
+                with self.metrics.timer("poll_handler"):
+                    self.handle_update(update)
+            except Exception as e:
+                # a bad update is skipped, not retried: the offset already moved past it
+                print(f"handler failed on update {update.get('update_id')}: {e!r}")
+
+    def run(self):
+        while True:
+            self.poll_once()
@@ -0,0 +1,231 @@
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import requests as req
+
+INTERACTIVE = 0
+BULK = 1
+LANES = ("interactive", "bulk")  # metric labels
+
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.stamp = time.monotonic()
+
+    def refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+
+    def wait_time(self, now):
+        self.refill(now)
+        return 0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+    def block(self, now, seconds):
+        # used after a 429: nothing goes out until retry_after has passed
+        self.tokens = 1 - seconds * self.rate
+        self.stamp = now
+
+
+# Outbound queue for Telegram sends. A global bucket keeps the bot under
+# Telegram's ~30 msg/s limit, per-chat buckets keep each chat under ~1 msg/s,
+# interactive replies are always picked before bulk traffic, and 429 replies
+# are retried after retry_after.
+#
+# Each lane keeps one FIFO per chat plus a heap of (eligible_at, seq, cid) with
+# one entry per chat that has something queued, so picking the next message is
+# O(log chats) instead of a scan of everything queued. A chat with a post in
+# flight is off both heaps until that post (or its 429 requeue) is done, so one
+# chat's messages go out one at a time and in order. Buckets of chats that went
+# quiet and have refilled are dropped by a periodic sweep.
+class Outbox:
+    def __init__(self, post=req.post, global_rate=30, chat_rate=1, chat_burst=3, senders=4, max_retries=3,
+                 flood_chats=3, idle_sweep=60, metrics=None):
+        self.post = post
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.chat_buckets = {}
+        self.max_retries = max_retries
+        self.queues = ({}, {})  # INTERACTIVE, BULK: cid -> deque of items
+        self.ready = ([], [])   # INTERACTIVE, BULK: heap of (eligible_at, seq, cid)
+        self.on_heap = (set(), set())  # cids with an entry in each heap
+        self.inflight = set()   # cids with a post in progress
+        self.depth = [0, 0]
+        self.seq = itertools.count()
+        self.cond = threading.Condition()
+        # 429s from this many different chats within a second = the bot as a whole is flooding
+        self.flood_chats = flood_chats
+        self.recent_429 = deque()  # (time, cid)
+        self.idle_sweep = idle_sweep
+        self.next_sweep = time.monotonic() + idle_sweep
+        self.waits = deque(maxlen=1000)  # seconds from enqueue to send
+        self.sent = 0
+        self.retried = 0
+        self.metrics = metrics  # optional Metrics registry: outbox_wait histograms, outbox_depth gauges
+        for _ in range(senders):
+            threading.Thread(target=self.sender, daemon=True).start()
+
+    def send(self, url, cid, priority=INTERACTIVE, **kw):
+        # returns a Future resolving to the decoded Telegram reply
+        fut = Future()
+        with self.cond:
+            now = time.monotonic()
+            if now >= self.next_sweep:
+                self.sweep(now)
+            self.enqueue([url, cid, kw, fut, time.monotonic(), 0, priority])
+            self.cond.notify()
+        return fut
+
+    def enqueue(self, item, front=False):
+        # caller holds the condition
+        cid, priority = item[1], item[6]
+        q = self.queues[priority].get(cid)
+        if q is None:
+            q = self.queues[priority][cid] = deque()
+        if cid not in self.on_heap[priority] and cid not in self.inflight:
+            self.schedule(priority, time.monotonic(), cid)
+        if front:
+            q.appendleft(item)
+        else:
+            q.append(item)
+        self.set_depth(priority, 1)
+
+    def schedule(self, priority, eligible, cid):
+        heapq.heappush(self.ready[priority], (eligible, next(self.seq), cid))
+        self.on_heap[priority].add(cid)
+
+    def set_depth(self, priority, change):
+        self.depth[priority] += change
+        if self.metrics:
+            self.metrics.gauge("outbox_depth", LANES[priority], self.depth[priority])
+
+    def release(self, cid):
+        # caller holds the condition: the chat's post is done, put its queues back in line
+        self.inflight.discard(cid)
+        now = time.monotonic()
+        for priority in (INTERACTIVE, BULK):
+            if cid in self.queues[priority] and cid not in self.on_heap[priority]:
+                self.schedule(priority, now + self.chat_bucket(cid).wait_time(now), cid)
+        self.cond.notify_all()
+
+    def chat_bucket(self, cid):
+        b = self.chat_buckets.get(cid)
+        if b is None:
+            b = self.chat_buckets[cid] = TokenBucket(self.chat_rate, self.chat_burst)
+        return b
+
+    def sweep(self, now):
+        # a chat with nothing queued and a full bucket is the same as a new one
+        busy = self.queues[INTERACTIVE].keys() | self.queues[BULK].keys()
+        for cid, b in list(self.chat_buckets.items()):
+            if cid not in busy:
+                b.refill(now)
+                if b.tokens >= b.burst:
+                    del self.chat_buckets[cid]
+        self.next_sweep = now + self.idle_sweep
+
+    def next_item(self):
+        # first ready item, interactive lane first; else how long until one is
+        now = time.monotonic()
+        if now >= self.next_sweep:
+            self.sweep(now)
+        g = self.global_bucket.wait_time(now)
+        if g:
+            return None, g
+        delay = None
+        for priority, heap in enumerate(self.ready):
+            while heap:
+                eligible, seq, cid = heap[0]
+                if cid in self.inflight:
+                    # queued in this lane while the other lane's post is out; release() re-adds it
+                    heapq.heappop(heap)
+                    self.on_heap[priority].discard(cid)
+                    continue
+                if eligible > now:
+                    delay = eligible - now if delay is None else min(delay, eligible - now)
+                    break
+                bucket = self.chat_bucket(cid)
+                w = bucket.wait_time(now)
+                if w:
+                    # eligible_at was a guess (the bucket may have been blocked since); fix it up
+                    heapq.heapreplace(heap, (now + w, seq, cid))
+                    continue
+                q = self.queues[priority][cid]
+                item = q.popleft()
+                self.set_depth(priority, -1)
+                self.global_bucket.take()
+                bucket.take()
+                heapq.heappop(heap)
+                self.on_heap[priority].discard(cid)
+                if not q:
+                    del self.queues[priority][cid]
+                self.inflight.add(cid)
+                return item, None
+        return None, delay
+
+    def note_429(self, now, cid, retry_after):
+        # caller holds the condition
+        self.chat_bucket(cid).block(now, retry_after)
+        self.recent_429.append((now, cid))
+        while self.recent_429[0][0] < now - 1:
+            self.recent_429.popleft()
+        if len({c for _, c in self.recent_429}) >= self.flood_chats:
+            self.global_bucket.block(now, retry_after)
+
+    def sender(self):
+        while True:
+            with self.cond:
+                item, delay = self.next_item()
+                if item is None:
+                    self.cond.wait(delay)
+                    continue
+            url, cid, kw, fut, queued_at, tries, priority = item
+            try:
+                r = self.post(url, **kw)
+                res = r.json()
+            except Exception as e:
+                with self.cond:
+                    self.release(cid)
+                fut.set_exception(e)
+                continue
+            if r.status_code == 429 and tries < self.max_retries:
+                retry_after = res.get("parameters", {}).get("retry_after", 1)
+                item[5] += 1
+                with self.cond:
+                    self.retried += 1
+                    self.note_429(time.monotonic(), cid, retry_after)
+                    # back at the head of its chat's queue, ahead of anything queued since
+                    self.enqueue(item, front=True)
+                    self.release(cid)
+                continue
+            waited = time.monotonic() - queued_at
+            with self.cond:
+                self.sent += 1
+                self.waits.append(waited)
+                self.release(cid)
+            if self.metrics:
+                self.metrics.observe("outbox_wait", LANES[priority], waited)
+            fut.set_result(res)
+
+    def stats(self):
+        with self.cond:
+            waits = sorted(self.waits)
+            return {
+                "interactive_depth": self.depth[INTERACTIVE],
+                "bulk_depth": self.depth[BULK],
+                "chats_tracked": len(self.chat_buckets),
+                "sent": self.sent,
+                "retried": self.retried,
+                "wait_p50_ms": round(waits[len(waits) // 2] * 1000, 2) if waits else 0,
+                "wait_max_ms": round(waits[-1] * 1000, 2) if waits else 0,
+            }
@@ -0,0 +1,158 @@
+import asyncio
+import hmac
+import json
+import time
+from collections import deque
+
+import requests as req
+
+
+# Minimal asyncio HTTP server: Telegram POSTs updates here, they go into a
+# queue and worker tasks hand them to the bot's handleUpdate.
+class WebhookServer:
+    def __init__(self, handle_update, secret=None, host="0.0.0.0", port=8443, path="/webhook", workers=4,
+                 max_body=1 << 20, metrics=None):
+        self.handle_update = handle_update
+        self.secret = secret
+        self.host = host
+        self.port = port
+        self.path = path
+        self.workers = workers
+        self.max_body = max_body  # updates are a few KB; anything bigger is refused unread
+        self.queue = None
+        # ms from POST received until handle_update returned; for bot.py that is
+        # dispatch onto the chat's queue, not the handler finishing
+        self.latencies = deque(maxlen=1000)
+        self.metrics = metrics  # optional Metrics registry; latencies also go there as webhook_ingest
+        self.received = 0
+        self.rejected = 0
+
+    # ----------------- HTTP -----------------
+    async def handle_conn(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except asyncio.LimitOverrunError:
+                    await self.respond(writer, "431 Request Header Fields Too Large")
+                    break
+                received_at = time.monotonic()
+                try:
+                    method, path, headers, length = self.parse_head(head)
+                except ValueError:
+                    await self.respond(writer, "400 Bad Request")
+                    break
+
+                # everything that can be decided from the headers is, before any body is read;
+                # a refused body is never read, so the connection can't be reused after it
+                status = self.check(method, path, headers, length)
+                if status:
+                    await self.respond(writer, status)
+                    break
+                body = await reader.readexactly(length)
+                await self.respond(writer, self.accept(body, received_at))
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, writer, status):
+        writer.write(f"HTTP/1.1 {status}\r\nContent-Length: 0\r\n\r\n".encode())
+        await writer.drain()
+
+    def parse_head(self, head):
+        lines = head.decode("latin-1").split("\r\n")
+        method, path, _ = lines[0].split(" ", 2)
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                k, v = line.split(":", 1)
+                headers[k.strip().lower()] = v.strip()
+        length = int(headers.get("content-length", 0))
+        if length < 0:
+            raise ValueError("negative Content-Length")
+        return method, path, headers, length
+
+    def check(self, method, path, headers, length):
+        if method != "POST" or path != self.path:
+            return "404 Not Found"
+        # compared as bytes: compare_digest rejects non-ASCII str, and headers are latin-1
+        token = headers.get("x-telegram-bot-api-secret-token", "").encode("latin-1")
+        if self.secret and not hmac.compare_digest(token, self.secret.encode()):
+            self.rejected += 1
+            return "403 Forbidden"
+        if length > self.max_body:
+            self.rejected += 1
+            return "413 Payload Too Large"
+        return None
+
+    def accept(self, body, received_at):
+        try:
+            update = json.loads(body)
+        except ValueError:
+            return "400 Bad Request"
+        self.received += 1
+        self.queue.put_nowait((received_at, update))
+        return "200 OK"
+
+    # ----------------- WORKERS -----------------
+    async def worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            received_at, update = await self.queue.get()
+            try:
+                await loop.run_in_executor(None, self.handle_update, update)
+            except Exception as e:
+                print(f"Webhook handler error: {e}")
+            elapsed = time.monotonic() - received_at
+            self.latencies.append(elapsed * 1000)
+            if self.metrics:
+                self.metrics.observe("webhook_ingest", "", elapsed)
+            self.queue.task_done()
+
+    def stats(self):
+        lat = sorted(self.latencies)
+        if not lat:
+            return {"received": self.received, "rejected": self.rejected}
+        return {
+            "received": self.received,
+            "rejected": self.rejected,
+            "queued": self.queue.qsize(),
+            "p50_ms": round(lat[len(lat) // 2], 2),
+            "p95_ms": round(lat[min(len(lat) - 1, int(len(lat) * 0.95))], 2),
+            "max_ms": round(lat[-1], 2),
+        }
+
+    # ----------------- RUN -----------------
+    async def start(self):
+        self.queue = asyncio.Queue()
+        for _ in range(self.workers):
+            asyncio.create_task(self.worker())
+        return await asyncio.start_server(self.handle_conn, self.host, self.port)
+
+    async def report(self, interval):
+        while True:
+            await asyncio.sleep(interval)
+            print(f"Webhook stats: {self.stats()}")
+
+    async def serve(self, stats_every=300):
+        server = await self.start()
+        print(f"Webhook listening on {self.host}:{self.port}{self.path}")
+        if stats_every:
+            asyncio.create_task(self.report(stats_every))
+        async with server:
+            await server.serve_forever()
+
+
+def set_webhook(api_url, url, secret=None, allowed_updates=None):
+    # api_url is the bot's https://api.telegram.org/bot<token> base
+    payload = {"url": url}
+    if secret:
+        payload["secret_token"] = secret
+    if allowed_updates:
+        payload["allowed_updates"] = allowed_updates
+    return req.post(f"{api_url}/setWebhook", json=payload).json()
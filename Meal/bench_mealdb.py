@@ -0,0 +1,89 @@
+# Concurrency benchmark for MealDBClient: N simulated users hit a local MealDB
+# stub at once, each doing what a browse session costs upstream (filter a
+# category, look up a meal, search by name). Compared against the blocking
+# requests.get helpers meal2 used before, called from the same async handlers.
+# Reports wall time, each user's time to finish (from the common start) and
+# how late a 10 ms ticker on the event loop ran - the stall every other chat
+# would have felt.
+#
+#   python bench_mealdb.py [--users 200] [--delay 0.02] [--connections 20]
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import tempfile
+import time
+
+import requests
+
+from mealstub import MealDBStub
+
+# meal2 creates favorites.json and its mirror database in the working directory
+os.chdir(tempfile.mkdtemp())
+from meal2 import MealDBClient  # noqa: E402
+
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+SESSION = [("/filter.php", {"c": "Chicken"}), ("/lookup.php", {"i": "52772"}), ("/search.php", {"s": "chicken"})]
+
+
+async def ticker(lags, stop):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.01)
+        lags.append(time.perf_counter() - start - 0.01)
+
+
+async def drive(users, user):
+    lags, stop = [], asyncio.Event()
+    tick = asyncio.create_task(ticker(lags, stop))
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*(user(start) for _ in range(users)))
+    wall = time.perf_counter() - start
+    stop.set()
+    await tick
+    return wall, sorted(latencies), max(lags or [0])
+
+
+def report(name, users, wall, latencies, lag):
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    print(f"  {name:<26} wall {wall:6.2f} s  user p50 {statistics.median(latencies) * 1000:8.1f} ms  "
+          f"p95 {p95 * 1000:8.1f} ms  max loop stall {lag * 1000:8.1f} ms  "
+          f"({users * len(SESSION) / wall:6.1f} req/s)")
+
+
+async def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--users", type=int, default=200)
+    ap.add_argument("--delay", type=float, default=0.02)
+    ap.add_argument("--connections", type=int, default=20)
+    args = ap.parse_args()
+    stub = MealDBStub(args.delay).start()
+    base = stub.url
+    print(f"{args.users} users x {len(SESSION)} MealDB calls, stub answers in {args.delay * 1000:g} ms")
+
+    session = requests.Session()
+
+    async def blocking_user(start):
+        # the old helpers: requests.get straight from the async handler
+        for path, params in SESSION:
+            session.get(base + path, params=params, timeout=10).json()
+        return time.perf_counter() - start
+
+    report("blocking requests.get", args.users, *await drive(args.users, blocking_user))
+
+    client = MealDBClient(base=base, max_connections=args.connections)
+
+    async def async_user(start):
+        for path, params in SESSION:
+            await client.fetch(path, **params)
+        return time.perf_counter() - start
+
+    report(f"MealDBClient ({args.connections} conns)", args.users, *await drive(args.users, async_user))
+    await client.close()
+    stub.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
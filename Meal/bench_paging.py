@@ -0,0 +1,102 @@
+# Upstream calls per page flip through the category / cuisine listings, against
+# a local MealDB stub that counts requests. Each simulated user opens a
+# category and flips through every page of it, as mealsnav: callbacks do.
+# Runs meal2's get_meals_by_category (AsyncListingCache) and the threaded
+# ListingCache meal1 uses, next to the uncached fetch-per-flip baseline, then
+# lets the entries go stale to show a flip still answers from memory while one
+# background refresh per listing goes upstream.
+#
+#   python bench_paging.py [--users 50] [--listing 60] [--delay 0.02]
+import argparse
+import asyncio
+import logging
+import os
+import tempfile
+import time
+
+import requests
+
+from listingcache import ListingCache
+from mealstub import MealDBStub
+
+# meal2 creates favorites.json and its mirror database in the working directory
+os.chdir(tempfile.mkdtemp())
+import meal2  # noqa: E402
+
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+CATEGORIES = ["Beef", "Chicken", "Dessert", "Pasta", "Seafood"]
+
+
+def report(name, stub, before, flips, elapsed):
+    calls = stub.total() - before
+    print(f"  {name:<34} {flips:5d} flips  {calls:4d} upstream calls  "
+          f"{elapsed / flips * 1000:8.3f} ms/flip")
+
+
+async def flip_async(get, users, pages):
+    # every user opens one category and walks all its pages
+    async def user(i):
+        for _ in range(pages):
+            await get(CATEGORIES[i % len(CATEGORIES)])
+    start = time.perf_counter()
+    await asyncio.gather(*(user(i) for i in range(users)))
+    return users * pages, time.perf_counter() - start
+
+
+def flip_sync(get, users, pages):
+    start = time.perf_counter()
+    for i in range(users):
+        for _ in range(pages):
+            get(CATEGORIES[i % len(CATEGORIES)])
+    return users * pages, time.perf_counter() - start
+
+
+async def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--users", type=int, default=50)
+    ap.add_argument("--listing", type=int, default=60)
+    ap.add_argument("--delay", type=float, default=0.02)
+    args = ap.parse_args()
+    stub = MealDBStub(args.delay, args.listing).start()
+    pages = (args.listing + meal2.ITEMS_PER_PAGE - 1) // meal2.ITEMS_PER_PAGE
+    print(f"{args.users} users x {pages} pages of a {args.listing}-meal listing, {len(CATEGORIES)} categories")
+
+    # meal2: the helpers read the module-level client, so point it at the stub
+    meal2.mealdb = meal2.MealDBClient(base=stub.url)
+
+    async def uncached(category):
+        return await meal2.load_filter("c", category)
+
+    before = stub.total()
+    report("meal2, no cache (before)", stub, before, *await flip_async(uncached, args.users, pages))
+    before = stub.total()
+    report("meal2 cold (first open per listing)", stub, before, *await flip_async(meal2.get_meals_by_category, len(CATEGORIES), 1))
+    before = stub.total()
+    report("meal2 warm page flips", stub, before, *await flip_async(meal2.get_meals_by_category, args.users, pages))
+    meal2.listings.ttl = 0
+    before = stub.total()
+    report("meal2 stale page flips", stub, before, *await flip_async(meal2.get_meals_by_category, args.users, pages))
+    await asyncio.sleep(args.delay * 5)
+    print(f"    background refreshes after the stale run: {stub.total() - before}")
+    await meal2.mealdb.close()
+
+    # meal1's threaded cache, loading with requests like meal1.load_filter
+    session = requests.Session()
+    cache = ListingCache()
+
+    def load(category):
+        return session.get(f"{stub.url}/filter.php", params={"c": category}, timeout=10).json()["meals"]
+
+    def get(category):
+        return cache.get(f"c:{category}", lambda: load(category))
+
+    before = stub.total()
+    report("meal1 cold (first open per listing)", stub, before, *flip_sync(get, len(CATEGORIES), 1))
+    before = stub.total()
+    report("meal1 warm page flips", stub, before, *flip_sync(get, args.users, pages))
+    stub.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
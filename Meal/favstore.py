@@ -0,0 +1,34 @@
+import time
+
+MISSING_RETRY = 86400  # seconds before a favorite MealDB couldn't resolve is looked up again
+
+# favorites[chat_id] = [{"id": ..., "name": ..., "thumb": ...}, ...] in favorites.json.
+# Older files hold bare meal ids; those are filled in when first displayed. An
+# id that can't be resolved is stored with "missing": <when>, so opening the
+# list doesn't look it up again until MISSING_RETRY has passed.
+
+
+def fav_id(entry):
+    return entry if isinstance(entry, str) else entry["id"]
+
+
+def fav_entry(meal):
+    return {"id": meal["idMeal"], "name": meal.get("strMeal") or "", "thumb": meal.get("strMealThumb") or ""}
+
+
+def missing_entry(meal_id, now=None):
+    return {"id": meal_id, "name": "", "thumb": "", "missing": now or time.time()}
+
+
+def needs_lookup(entry, now=None):
+    if isinstance(entry, str):
+        return True
+    if entry.get("name"):
+        return False
+    return (now or time.time()) - entry.get("missing", 0) >= MISSING_RETRY
+
+
+def merge_lookups(current, looked_up, now=None):
+    # current is the stored list, re-read after the lookups (it may have changed
+    # meanwhile); looked_up maps id -> entry as displayed
+    return [looked_up.get(fav_id(e), e) if needs_lookup(e, now) else e for e in current]
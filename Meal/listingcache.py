@@ -0,0 +1,105 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+# Stale-while-revalidate cache for the category / cuisine listings every page
+# flip needs: fresh entries are returned as is, stale ones are returned at once
+# while a single background load refetches them. Only a miss waits on a load.
+# The bookkeeping is shared; ListingCache loads on a thread pool (meal1, which
+# is threaded), AsyncListingCache loads in tasks on the running loop (meal2).
+class BaseListingCache:
+    def __init__(self, ttl=600, max_stale=86400, maxsize=256):
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.maxsize = maxsize
+        self.items = OrderedDict()  # key -> (fetched_at, value)
+        self.inflight = {}          # key -> Future / Task of the load in progress
+        self.loads = 0
+
+    def lookup(self, key, now):
+        # (value, stale) for a servable entry, None on a miss
+        entry = self.items.get(key)
+        if entry is None or now - entry[0] >= self.max_stale:
+            return None
+        self.items.move_to_end(key)
+        return entry[1], now - entry[0] >= self.ttl
+
+    def store(self, key, value):
+        self.loads += 1
+        self.items[key] = (time.monotonic(), value)
+        self.items.move_to_end(key)
+        while len(self.items) > self.maxsize:
+            self.items.popitem(last=False)
+
+
+class ListingCache(BaseListingCache):
+    def __init__(self, ttl=600, max_stale=86400, maxsize=256, workers=4):
+        super().__init__(ttl, max_stale, maxsize)
+        self.lock = threading.Lock()
+        self.pool = ThreadPoolExecutor(workers)
+
+    def get(self, key, load):
+        with self.lock:
+            hit = self.lookup(key, time.monotonic())
+            if hit is not None:
+                if hit[1]:
+                    self.revalidate(key, load)
+                return hit[0]
+            fut = self.revalidate(key, load)
+        return fut.result()
+
+    def revalidate(self, key, load):
+        # called with the lock held; one load per key at a time
+        fut = self.inflight.get(key)
+        if fut is None:
+            fut = self.inflight[key] = self.pool.submit(self.fill, key, load)
+        return fut
+
+    def fill(self, key, load):
+        try:
+            value = load()
+            with self.lock:
+                self.store(key, value)
+            return value
+        except Exception:
+            logger.exception("listing refresh failed for %s", key)
+            raise
+        finally:
+            with self.lock:
+                self.inflight.pop(key, None)
+
+
+class AsyncListingCache(BaseListingCache):
+    # single-threaded: everything runs on the event loop, so no lock
+    async def get(self, key, load):
+        hit = self.lookup(key, time.monotonic())
+        if hit is not None:
+            if hit[1]:
+                self.revalidate(key, load)
+            return hit[0]
+        return await asyncio.shield(self.revalidate(key, load))
+
+    def revalidate(self, key, load):
+        task = self.inflight.get(key)
+        if task is None:
+            task = self.inflight[key] = asyncio.create_task(self.fill(key, load))
+            # background refreshes are never awaited; a failure just keeps the stale entry
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        return task
+
+    async def fill(self, key, load):
+        try:
+            value = await load()
+            self.store(key, value)
+            return value
+        except Exception:
+            logger.exception("listing refresh failed for %s", key)
+            raise
+        finally:
+            self.inflight.pop(key, None)
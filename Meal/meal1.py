@@ -7,6 +7,7 @@ Features:
 - /categories (Nx3) with pagination (edits same message)
 - /cuisines (Nx3) with pagination (edits same message)
 - /search <name>
+- /ingredients <a and b> (local mirror)
 - /random
 - /favorites (save/view)
 - View recipe details, save recipe from details
@@ -19,21 +20,31 @@ import html
 import json
 import os
 import urllib.parse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from mealmirror import MealMirror
+from listingcache import ListingCache
+from favstore import fav_id, fav_entry, missing_entry, needs_lookup, merge_lookups
 
 # ---------------- CONFIG ----------------
 TELEGRAM_BOT_TOKEN = ""   # <-- replace
 bot = telebot.TeleBot(TELEGRAM_BOT_TOKEN, parse_mode="HTML")
 
 FAVORITES_FILE = "favorites.json"
+MIRROR_DB = "mealdb.sqlite3"
 ITEMS_PER_PAGE = 9   # 3x3 grid
+MAX_RESULTS = 30     # search / ingredient result buttons per message
+HYDRATE_CONCURRENCY = 8  # parallel lookups when filling in legacy favorites
 
 MEALDB_BASE = "https://www.themealdb.com/api/json/v1/1"
+mirror = MealMirror(MIRROR_DB, MEALDB_BASE)
 
 # ---------------- STORAGE ----------------
 if not os.path.exists(FAVORITES_FILE):
     with open(FAVORITES_FILE, "w") as f:
         json.dump({}, f)
 
+# entry format and legacy handling: see favstore.py
 def load_favorites():
     with open(FAVORITES_FILE, "r") as f:
         return json.load(f)
@@ -59,34 +70,55 @@ def quote_cb(s: str) -> str:
 def unquote_cb(s: str) -> str:
     return urllib.parse.unquote_plus(s)
 
+# ---------------- LISTING CACHE ----------------
+listings = ListingCache()
+
 # ---------------- MEALDB HELPERS ----------------
-def get_categories():
+# served from the local mirror once it has synced; MealDB is only hit before that
+def load_categories():
+    if mirror.ready:
+        return mirror.categories()
     url = f"{MEALDB_BASE}/categories.php"
     r = requests.get(url)
     j = r.json()
     return [c["strCategory"] for c in j["categories"]]
 
-def get_meals_by_category(category):
-    url = f"{MEALDB_BASE}/filter.php?c={urllib.parse.quote_plus(category)}"
+def load_filter(param, value):
+    # param is filter.php's: "c" for a category, "a" for an area (cuisine)
+    if mirror.ready:
+        return mirror.by_category(value) if param == "c" else mirror.by_area(value)
+    url = f"{MEALDB_BASE}/filter.php?{param}={urllib.parse.quote_plus(value)}"
     r = requests.get(url); j = r.json()
     return j.get("meals") or []
 
+def get_categories():
+    return listings.get("categories", load_categories)
+
+def get_meals_by_category(category):
+    return listings.get(f"c:{category}", lambda: load_filter("c", category))
+
 def get_meals_by_cuisine(cuisine):
-    url = f"{MEALDB_BASE}/filter.php?a={urllib.parse.quote_plus(cuisine)}"
-    r = requests.get(url); j = r.json()
-    return j.get("meals") or []
+    return listings.get(f"a:{cuisine}", lambda: load_filter("a", cuisine))
 
 def get_meal_by_id(meal_id):
+    meal = mirror.meal(meal_id)
+    if meal:
+        return meal
     url = f"{MEALDB_BASE}/lookup.php?i={urllib.parse.quote_plus(str(meal_id))}"
     r = requests.get(url); j = r.json()
+    mirror.upsert(j["meals"][0])
     return j["meals"][0]
 
 def search_meals_by_name(q):
+    if mirror.ready:
+        return mirror.by_name(q)
     url = f"{MEALDB_BASE}/search.php?s={urllib.parse.quote_plus(q)}"
     r = requests.get(url); j = r.json()
     return j.get("meals") or []
 
 def random_meal():
+    if mirror.ready:
+        return mirror.random()
     url = f"{MEALDB_BASE}/random.php"
     r = requests.get(url); j = r.json()
     return j["meals"][0]
@@ -157,6 +189,26 @@ def build_meals_keyboard(meals, mode, name, page):
     kb.add(InlineKeyboardButton(back_label, callback_data=f"back:{mode}"))
     return kb
 
+def build_results_keyboard(meals):
+    """
+    meals: search or ingredient results; each button opens its meal by id,
+    so two recipes with similar names can't be confused
+    """
+    kb = InlineKeyboardMarkup()
+    row = []
+    for m in meals[:MAX_RESULTS]:
+        row.append(InlineKeyboardButton(safe(m["strMeal"]), callback_data=f"meal:{m['idMeal']}"))
+        if len(row) == 3:
+            kb.add(*row); row = []
+    if row:
+        kb.add(*row)
+    return kb
+
+def results_text(title, meals):
+    if len(meals) > MAX_RESULTS:
+        return f"{title} — first {MAX_RESULTS} of {len(meals)}, choose:"
+    return f"{title} — choose:"
+
 def build_meal_actions(meal_id):
     kb = InlineKeyboardMarkup()
     kb.row(
@@ -231,10 +283,44 @@ def cmd_search(msg):
     if not meals:
         bot.send_message(msg.chat.id, f"😔 No recipes found for «{safe(q)}».")
         return
-    # show meals list using meal page UI — create names list to reuse build_items_keyboard
-    names = [m["strMeal"] for m in meals]
-    kb = build_items_keyboard(names, "search", 0)
-    bot.send_message(msg.chat.id, f"🔎 Results for «{safe(q)}» — choose:", reply_markup=kb)
+    kb = build_results_keyboard(meals)
+    bot.send_message(msg.chat.id, results_text(f"🔎 Results for «{safe(q)}»", meals), reply_markup=kb)
+
+@bot.message_handler(commands=['ingredients'])
+def cmd_ingredients(msg):
+    parts = msg.text.split(maxsplit=1)
+    if len(parts) < 2:
+        bot.send_message(msg.chat.id, "❗ Usage: /ingredients chicken and garlic")
+        return
+    if not mirror.ready:
+        bot.send_message(msg.chat.id, "⏳ Recipe index is still syncing, try again shortly.")
+        return
+    q = parts[1].strip()
+    meals = mirror.with_ingredients(q)
+    if not meals:
+        bot.send_message(msg.chat.id, f"😔 No recipes contain «{safe(q)}».")
+        return
+    kb = build_results_keyboard(meals)
+    bot.send_message(msg.chat.id, results_text(f"🧂 Recipes with «{safe(q)}»", meals), reply_markup=kb)
+
+def hydrate_favorites(entries):
+    # legacy bare ids -> {"id", "name", "thumb"}, looked up in parallel (bounded);
+    # unresolvable ids come back marked missing
+    now = time.time()
+    if not any(needs_lookup(e, now) for e in entries):
+        return list(entries)
+
+    def one(entry):
+        if not needs_lookup(entry, now):
+            return entry
+        try:
+            meal = get_meal_by_id(fav_id(entry))
+        except Exception:
+            meal = None
+        return fav_entry(meal) if meal else missing_entry(fav_id(entry), now)
+
+    with ThreadPoolExecutor(HYDRATE_CONCURRENCY) as pool:
+        return list(pool.map(one, entries))
 
 @bot.message_handler(commands=['favorites'])
 def cmd_favorites(msg):
@@ -243,13 +329,19 @@ def cmd_favorites(msg):
     if user not in favs or not favs[user]:
         bot.send_message(msg.chat.id, "💔 You have no saved recipes yet.")
         return
+    entries = hydrate_favorites(favs[user])
+
+    # write back what was looked up, missing markers included; re-read first, the list may have changed meanwhile
+    data = load_favorites()
+    current = data.get(user) or []
+    updated = merge_lookups(current, {e["id"]: e for e in entries})
+    if updated != current:
+        data[user] = updated
+        save_favorites(data)
+
     kb = InlineKeyboardMarkup(); row=[]
-    for idx, mid in enumerate(favs[user], start=1):
-        try:
-            meal = get_meal_by_id(mid)
-            row.append(InlineKeyboardButton(safe(meal["strMeal"]), callback_data=f"meal:{mid}"))
-        except Exception:
-            continue
+    for e in entries:
+        row.append(InlineKeyboardButton(safe(e["name"] or f"Recipe #{e['id']}"), callback_data=f"meal:{e['id']}"))
         if len(row) == 3:
             kb.add(*row); row=[]
     if row: kb.add(*row)
@@ -322,12 +414,12 @@ def callback_all(call):
             return
 
         if prefix == "search":
-            # find the first meal by name and show details
-            results = search_meals_by_name(item)
-            if not results:
+            # buttons on messages sent before results carried meal ids: only an exact name match will do
+            meal = next((m for m in search_meals_by_name(item) if m["strMeal"].lower() == item.lower()), None)
+            if not meal:
                 bot.answer_callback_query(call.id, "No recipe details found.")
                 return
-            send_meal_details(call.message.chat.id, results[0])
+            send_meal_details(call.message.chat.id, meal)
             return
 
     # mealsnav: pagination within the meal list
@@ -363,8 +455,13 @@ def callback_all(call):
         user = str(call.message.chat.id)
         if user not in favs:
             favs[user] = []
-        if meal_id not in favs[user]:
-            favs[user].append(meal_id)
+        if all(fav_id(e) != meal_id for e in favs[user]):
+            # the meal was just displayed, so this is normally a local mirror hit
+            try:
+                meal = get_meal_by_id(meal_id)
+            except Exception:
+                meal = None
+            favs[user].append(fav_entry(meal) if meal else {"id": meal_id, "name": "", "thumb": ""})
             save_favorites(favs)
             bot.answer_callback_query(call.id, "💾 Saved to favorites.")
         else:
@@ -403,5 +500,6 @@ def callback_all(call):
 
 # ---------------- RUN ----------------
 if __name__ == "__main__":
+    mirror.start()
     print("🚀 MealRecipe Bot running...")
     bot.infinity_polling()
@@ -2,11 +2,12 @@
 """
 Full Meal Recipe Bot using python-telegram-bot (v20+) + TheMealDB
 Features:
- - /start, /categories, /cuisines, /search, /random, /favorites
+ - /start, /categories, /cuisines, /search, /ingredients, /random, /favorites
+ - Local SQLite mirror of MealDB (mealmirror.py) with full-text / ingredient search
  - Nx3 inline keyboards with pagination that EDIT the same message
  - Recipe details, Save to favorites
  - Step-by-step instructions with Next/Prev (edits the same step message)
- - Persistent favorites.json per chat
+ - Persistent favorites.json per chat (id + name + thumbnail, paginated)
 """
 
 import os
@@ -14,8 +15,15 @@ import json
 import html
 import urllib.parse
 import logging
-import requests
-from typing import List, Dict, Any, Optional
+import asyncio
+import secrets
+import time
+import httpx
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
+from mealmirror import MealMirror
+from listingcache import AsyncListingCache
+from favstore import fav_id, fav_entry, missing_entry, needs_lookup, merge_lookups
 
 from telegram import (
     Update,
@@ -36,7 +44,10 @@ from telegram.ext import (
 BOT_TOKEN = ""  # <-- set your token here
 MEALDB_BASE = "https://www.themealdb.com/api/json/v1/1"
 FAVORITES_FILE = "favorites.json"
+MIRROR_DB = "mealdb.sqlite3"
+MIRROR_REFRESH = 6 * 3600  # seconds between incremental mirror syncs
 ITEMS_PER_PAGE = 9  # 3x3 layout
+HYDRATE_CONCURRENCY = 8  # parallel lookups when filling in legacy favorites
 # Predefined cuisines list (extendable)
 CUISINES = [
     "Indian","Chinese","Italian","Korean","Japanese","Thai","Mexican","French","Spanish",
@@ -52,11 +63,12 @@ if not os.path.exists(FAVORITES_FILE):
     with open(FAVORITES_FILE, "w") as f:
         json.dump({}, f)
 
-def load_favorites() -> Dict[str, List[str]]:
+# entry format and legacy handling: see favstore.py
+def load_favorites() -> Dict[str, List[Any]]:
     with open(FAVORITES_FILE, "r") as f:
         return json.load(f)
 
-def save_favorites(data: Dict[str, List[str]]):
+def save_favorites(data: Dict[str, List[Any]]):
     with open(FAVORITES_FILE, "w") as f:
         json.dump(data, f, indent=2)
 
@@ -70,63 +82,161 @@ def quote_cb(s: str) -> str:
 def unquote_cb(s: str) -> str:
     return urllib.parse.unquote_plus(s)
 
+# ---------------- MEALDB CLIENT ----------------
+# pooled async client so MealDB calls never block the PTB event loop
+# (httpx already ships with python-telegram-bot)
+class MealDBClient:
+    def __init__(self, base: str = MEALDB_BASE, timeout: float = 10, retries: int = 2, max_connections: int = 20):
+        self.retries = retries
+        self.client = httpx.AsyncClient(
+            base_url=base,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+
+    async def fetch(self, path: str, **params) -> Dict[str, Any]:
+        for attempt in range(self.retries + 1):
+            try:
+                r = await self.client.get(path, params=params)
+                r.raise_for_status()
+                return r.json()
+            except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                if attempt == self.retries or (isinstance(e, httpx.HTTPStatusError) and e.response.status_code < 500):
+                    raise
+                await asyncio.sleep(0.5 * 2 ** attempt)
+        return {}
+
+    async def close(self):
+        await self.client.aclose()
+
+mealdb = MealDBClient()
+# the mirror syncs on its own thread with a blocking client; reads are local SQLite
+mirror = MealMirror(MIRROR_DB, MEALDB_BASE, get=httpx.Client().get)
+
+# ---------------- LISTING CACHE ----------------
+listings = AsyncListingCache()
+
 # ---------------- MEALDB HELPERS ----------------
-def get_categories() -> List[str]:
+# served from the local mirror once it has synced; MealDB is only hit before that
+async def load_categories() -> List[str]:
+    if mirror.ready:
+        return mirror.categories()
+    j = await mealdb.fetch("/categories.php")
+    return [c["strCategory"] for c in j.get("categories", [])]
+
+async def load_filter(param: str, value: str) -> List[Dict[str, Any]]:
+    # param is filter.php's: "c" for a category, "a" for an area (cuisine)
+    if mirror.ready:
+        return mirror.by_category(value) if param == "c" else mirror.by_area(value)
+    j = await mealdb.fetch("/filter.php", **{param: value})
+    return j.get("meals") or []
+
+async def get_categories() -> List[str]:
     try:
-        r = requests.get(f"{MEALDB_BASE}/categories.php", timeout=10)
-        j = r.json()
-        return [c["strCategory"] for c in j.get("categories", [])]
-    except Exception as e:
+        return await listings.get("categories", load_categories)
+    except Exception:
         logger.exception("get_categories failed")
         return []
 
-def get_meals_by_category(category: str) -> List[Dict[str, Any]]:
+async def get_meals_by_category(category: str) -> List[Dict[str, Any]]:
     try:
-        r = requests.get(f"{MEALDB_BASE}/filter.php?c={urllib.parse.quote_plus(category)}", timeout=10)
-        j = r.json()
-        return j.get("meals") or []
+        return await listings.get(f"c:{category}", lambda: load_filter("c", category))
     except Exception:
         logger.exception("get_meals_by_category failed")
         return []
 
-def get_meals_by_cuisine(cuisine: str) -> List[Dict[str, Any]]:
+async def get_meals_by_cuisine(cuisine: str) -> List[Dict[str, Any]]:
     try:
-        r = requests.get(f"{MEALDB_BASE}/filter.php?a={urllib.parse.quote_plus(cuisine)}", timeout=10)
-        j = r.json()
-        return j.get("meals") or []
+        return await listings.get(f"a:{cuisine}", lambda: load_filter("a", cuisine))
     except Exception:
         logger.exception("get_meals_by_cuisine failed")
         return []
 
-def get_meal_by_id(meal_id: str) -> Optional[Dict[str, Any]]:
+async def get_meal_by_id(meal_id: str) -> Optional[Dict[str, Any]]:
+    meal = mirror.meal(meal_id)
+    if meal:
+        return meal
     try:
-        r = requests.get(f"{MEALDB_BASE}/lookup.php?i={urllib.parse.quote_plus(str(meal_id))}", timeout=10)
-        j = r.json()
+        j = await mealdb.fetch("/lookup.php", i=str(meal_id))
         meals = j.get("meals")
+        if meals:
+            # the write commits and recounts under the mirror lock: keep it off the event loop
+            await asyncio.to_thread(mirror.upsert, meals[0])
         return meals[0] if meals else None
     except Exception:
         logger.exception("get_meal_by_id failed")
         return None
 
-def search_meals_by_name(q: str) -> List[Dict[str, Any]]:
+async def search_meals_by_name(q: str) -> List[Dict[str, Any]]:
+    if mirror.ready:
+        return mirror.by_name(q)
     try:
-        r = requests.get(f"{MEALDB_BASE}/search.php?s={urllib.parse.quote_plus(q)}", timeout=10)
-        j = r.json()
-        return j.get("meals") or []
+        j = await mealdb.fetch("/search.php", s=q)
+        meals = j.get("meals") or []
+        # full records: keep them so picking a result doesn't need a lookup
+        await asyncio.to_thread(mirror.upsert_many, meals)
+        return meals
     except Exception:
         logger.exception("search_meals_by_name failed")
         return []
 
-def random_meal() -> Optional[Dict[str, Any]]:
+async def random_meal() -> Optional[Dict[str, Any]]:
+    if mirror.ready:
+        return mirror.random()
     try:
-        r = requests.get(f"{MEALDB_BASE}/random.php", timeout=10)
-        j = r.json()
+        j = await mealdb.fetch("/random.php")
         meals = j.get("meals")
         return meals[0] if meals else None
     except Exception:
         logger.exception("random_meal failed")
         return None
 
+# ---------------- SEARCH RESULTS ----------------
+# Result sets behind search keyboards, keyed by a short id carried in
+# callback_data, so paging and picking a result never repeat the search.
+# Entries expire ttl seconds after last use; the store as a whole is LRU-capped
+# by the total number of results it holds.
+class SearchResults:
+    def __init__(self, ttl: float = 1800, max_results: int = 20000):
+        self.ttl = ttl
+        self.max_results = max_results
+        self.items: "OrderedDict[str, Tuple[float, str, List[Tuple[str, str]]]]" = OrderedDict()
+        self.size = 0
+
+    def drop(self, qid: str):
+        self.size -= len(self.items.pop(qid)[2])
+
+    def evict(self, now: float):
+        # least recently used first, which with a sliding ttl is also soonest to expire
+        while self.items:
+            qid, (expires, _, _) = next(iter(self.items.items()))
+            if expires > now and self.size <= self.max_results:
+                break
+            self.drop(qid)
+
+    def put(self, query: str, meals: List[Dict[str, Any]]) -> Tuple[str, List[Tuple[str, str]]]:
+        now = time.monotonic()
+        qid = secrets.token_urlsafe(6)
+        while qid in self.items:
+            qid = secrets.token_urlsafe(6)
+        results = [(m["idMeal"], m["strMeal"]) for m in meals]
+        self.items[qid] = (now + self.ttl, query, results)
+        self.size += len(results)
+        self.evict(now)
+        return qid, results
+
+    def get(self, qid: str) -> Optional[Tuple[str, List[Tuple[str, str]]]]:
+        now = time.monotonic()
+        self.evict(now)
+        entry = self.items.get(qid)
+        if entry is None:
+            return None
+        self.items[qid] = (now + self.ttl, entry[1], entry[2])
+        self.items.move_to_end(qid)
+        return entry[1], entry[2]
+
+search_results = SearchResults()
+
 # ---------------- KEYBOARDS ----------------
 def build_items_keyboard(items: List[str], prefix: str, page: int) -> InlineKeyboardMarkup:
     page_size = ITEMS_PER_PAGE
@@ -185,6 +295,57 @@ def build_meals_keyboard(meals: List[Dict[str,Any]], mode: str, name: str, page:
     kb_rows.append([InlineKeyboardButton(back_label, callback_data=f"back:{mode}")])
     return InlineKeyboardMarkup(kb_rows)
 
+def build_search_keyboard(qid: str, results: List[Tuple[str, str]], page: int) -> InlineKeyboardMarkup:
+    # buttons carry the result set id and the result's index, not the meal name
+    page_size = ITEMS_PER_PAGE
+    total_pages = (len(results) + page_size - 1) // page_size or 1
+    start = page * page_size
+
+    kb_rows = []
+    row = []
+    for i in range(start, min(start + page_size, len(results))):
+        row.append(InlineKeyboardButton(safe(results[i][1]), callback_data=f"select:search:{qid}:{i}"))
+        if len(row) == 3:
+            kb_rows.append(row)
+            row = []
+    if row:
+        kb_rows.append(row)
+
+    nav = []
+    if page > 0:
+        nav.append(InlineKeyboardButton("⬅️ Prev", callback_data=f"nav:search:{qid}:{page-1}"))
+    nav.append(InlineKeyboardButton(f"📄 {page+1}/{total_pages}", callback_data="noop"))
+    if start + page_size < len(results):
+        nav.append(InlineKeyboardButton("Next ➡️", callback_data=f"nav:search:{qid}:{page+1}"))
+    kb_rows.append(nav)
+
+    return InlineKeyboardMarkup(kb_rows)
+
+def build_favorites_keyboard(entries: List[Dict[str, str]], page: int, total: int) -> InlineKeyboardMarkup:
+    # entries is the current page only; total is the length of the whole list
+    total_pages = (total + ITEMS_PER_PAGE - 1) // ITEMS_PER_PAGE or 1
+
+    kb_rows = []
+    row = []
+    for e in entries:
+        row.append(InlineKeyboardButton(safe(e.get("name") or f"Recipe #{e['id']}"), callback_data=f"meal:{e['id']}"))
+        if len(row) == 3:
+            kb_rows.append(row)
+            row = []
+    if row:
+        kb_rows.append(row)
+
+    if total_pages > 1:
+        nav = []
+        if page > 0:
+            nav.append(InlineKeyboardButton("⬅️ Prev", callback_data=f"favs:{page-1}"))
+        nav.append(InlineKeyboardButton(f"📄 {page+1}/{total_pages}", callback_data="noop"))
+        if page < total_pages - 1:
+            nav.append(InlineKeyboardButton("Next ➡️", callback_data=f"favs:{page+1}"))
+        kb_rows.append(nav)
+
+    return InlineKeyboardMarkup(kb_rows)
+
 def build_detail_actions(meal_id: str) -> InlineKeyboardMarkup:
     kb = [
         [
@@ -252,7 +413,7 @@ async def start_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 # /categories
 async def categories_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    cats = get_categories()
+    cats = await get_categories()
     if not cats:
         await update.message.reply_text("⚠️ Could not fetch categories right now.")
         return
@@ -266,7 +427,7 @@ async def cuisines_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 # /random
 async def random_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    meal = random_meal()
+    meal = await random_meal()
     if not meal:
         await update.message.reply_text("⚠️ Could not fetch a random recipe.")
         return
@@ -278,34 +439,74 @@ async def search_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("❗ Usage: /search <recipe name>")
         return
     q = " ".join(context.args).strip()
-    meals = search_meals_by_name(q)
+    meals = await search_meals_by_name(q)
     if not meals:
         await update.message.reply_html(f"😔 No recipes found for «{safe(q)}».")
         return
-    # show names page using build_items_keyboard
-    names = [m["strMeal"] for m in meals]
-    kb = build_items_keyboard(names, "search", 0)
+    qid, results = search_results.put(q, meals)
+    kb = build_search_keyboard(qid, results, 0)
     await update.message.reply_html(f"🔎 Results for «{safe(q)}» — choose:", reply_markup=kb)
 
+# /ingredients chicken and garlic
+async def ingredients_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not context.args:
+        await update.message.reply_text("❗ Usage: /ingredients chicken and garlic")
+        return
+    if not mirror.ready:
+        await update.message.reply_text("⏳ Recipe index is still syncing, try again shortly.")
+        return
+    q = " ".join(context.args).strip()
+    meals = mirror.with_ingredients(q)
+    if not meals:
+        await update.message.reply_html(f"😔 No recipes contain «{safe(q)}».")
+        return
+    qid, results = search_results.put(q, meals)
+    kb = build_search_keyboard(qid, results, 0)
+    await update.message.reply_html(f"🧂 Recipes with «{safe(q)}» — choose:", reply_markup=kb)
+
 # /favorites
+async def hydrate_favorites(entries: List[Any]) -> List[Dict[str, str]]:
+    # legacy bare ids -> {"id", "name", "thumb"}, looked up in parallel (bounded);
+    # unresolvable ids come back marked missing
+    sem = asyncio.Semaphore(HYDRATE_CONCURRENCY)
+    now = time.time()
+
+    async def one(entry: Any) -> Dict[str, str]:
+        if not needs_lookup(entry, now):
+            return entry
+        async with sem:
+            meal = await get_meal_by_id(fav_id(entry))
+        return fav_entry(meal) if meal else missing_entry(fav_id(entry), now)
+
+    return list(await asyncio.gather(*(one(e) for e in entries)))
+
+async def favorites_page(user: str, page: int) -> Optional[Tuple[str, InlineKeyboardMarkup]]:
+    favs = load_favorites().get(user) or []
+    if not favs:
+        return None
+    total_pages = (len(favs) + ITEMS_PER_PAGE - 1) // ITEMS_PER_PAGE
+    page = max(0, min(page, total_pages - 1))
+    start = page * ITEMS_PER_PAGE
+    entries = await hydrate_favorites(favs[start:start + ITEMS_PER_PAGE])
+
+    # write back what was looked up, missing markers included; re-read first, the list may have changed meanwhile
+    data = load_favorites()
+    current = data.get(user) or []
+    updated = merge_lookups(current, {e["id"]: e for e in entries})
+    if updated != current:
+        data[user] = updated
+        save_favorites(data)
+
+    text = f"💖 Your favorites ({len(favs)})" + (f" — Page {page+1}/{total_pages}" if total_pages > 1 else "") + ":"
+    return text, build_favorites_keyboard(entries, page, len(favs))
+
 async def favorites_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    favs = load_favorites()
-    user = str(update.effective_chat.id)
-    if user not in favs or not favs[user]:
+    shown = await favorites_page(str(update.effective_chat.id), 0)
+    if not shown:
         await update.message.reply_text("💔 You have no saved recipes yet.")
         return
-    kb_rows = []
-    row = []
-    for mid in favs[user]:
-        meal = get_meal_by_id(mid)
-        if not meal:
-            continue
-        row.append(InlineKeyboardButton(safe(meal["strMeal"]), callback_data=f"meal:{mid}"))
-        if len(row) == 3:
-            kb_rows.append(row); row = []
-    if row:
-        kb_rows.append(row)
-    await update.message.reply_html("💖 Your favorites:", reply_markup=InlineKeyboardMarkup(kb_rows))
+    text, kb = shown
+    await update.message.reply_html(text, reply_markup=kb)
 
 # Universal callback handler
 async def callback_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -325,7 +526,7 @@ async def callback_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
             _, menu_type, page_str = data.split(":")
             page = int(page_str)
             if menu_type == "categories":
-                cats = get_categories()
+                cats = await get_categories()
                 kb = build_items_keyboard(cats, "category", page)
                 await query.edit_message_text(f"🍱 <b>Select a Category</b> (Page {page+1})", reply_markup=kb, parse_mode="HTML")
             else:
@@ -336,33 +537,40 @@ async def callback_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
             await query.answer("⚠️ Error loading menu.")
         return
 
-    # nav: categories/cuisines/search pagination
+    # nav: categories/cuisines pagination, nav:search:{qid}:{page} for search results
     if data.startswith("nav:"):
         try:
-            _, prefix, page_str = data.split(":")
-            page = int(page_str)
+            parts = data.split(":")
+            prefix = parts[1]
+            page = int(parts[-1])
             if prefix == "category":
-                cats = get_categories()
+                cats = await get_categories()
                 kb = build_items_keyboard(cats, "category", page)
                 await query.edit_message_text(f"🍱 <b>Select a Category</b> (Page {page+1})", reply_markup=kb, parse_mode="HTML")
             elif prefix == "cuisine":
                 kb = build_items_keyboard(CUISINES, "cuisine", page)
                 await query.edit_message_text(f"🌍 <b>Select a Cuisine</b> (Page {page+1})", reply_markup=kb, parse_mode="HTML")
             elif prefix == "search":
-                # For search pagination you'd have to keep results in session - simple placeholder:
-                await query.edit_message_text(f"🔎 Search results (Page {page+1})", parse_mode="HTML")
+                entry = search_results.get(parts[2]) if len(parts) == 4 else None
+                if not entry:
+                    await query.edit_message_text("⌛ These search results have expired, please search again.")
+                    return
+                q, results = entry
+                kb = build_search_keyboard(parts[2], results, page)
+                await query.edit_message_text(f"🔎 Results for «{safe(q)}» (Page {page+1}) — choose:", reply_markup=kb, parse_mode="HTML")
         except Exception:
             logger.exception("nav callback error")
             await query.answer("⚠️ Navigation error.")
         return
 
-    # select:prefix:quoted_item:page  -> category/cuisine/search selection
+    # select:prefix:quoted_item:page  -> category/cuisine selection
+    # select:search:{qid}:{index}     -> search result
     if data.startswith("select:"):
         try:
             _, prefix, quoted_item, page_str = data.split(":", 3)
             item = unquote_cb(quoted_item)
             if prefix == "category":
-                meals = get_meals_by_category(item)
+                meals = await get_meals_by_category(item)
                 if not meals:
                     await query.answer("No recipes found in this category.")
                     return
@@ -370,7 +578,7 @@ async def callback_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 await query.edit_message_text(f"🍴 <b>{safe(item)}</b> — recipes (Page 1)", reply_markup=kb, parse_mode="HTML")
                 return
             if prefix == "cuisine":
-                meals = get_meals_by_cuisine(item)
+                meals = await get_meals_by_cuisine(item)
                 if not meals:
                     await query.answer("No recipes found for this cuisine.")
                     return
@@ -378,12 +586,15 @@ async def callback_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 await query.edit_message_text(f"🌏 <b>{safe(item)}</b> — recipes (Page 1)", reply_markup=kb, parse_mode="HTML")
                 return
             if prefix == "search":
-                # select a name from search; attempt to fetch by name and show first match
-                results = search_meals_by_name(item)
-                if not results:
+                entry = search_results.get(quoted_item)
+                index = int(page_str)
+                if not entry or index >= len(entry[1]):
+                    await query.answer("⌛ Search expired, please search again.")
+                    return
+                meal = await get_meal_by_id(entry[1][index][0])
+                if not meal:
                     await query.answer("No recipe details found.")
                     return
-                meal = results[0]
                 await send_meal_details(query.message.chat.id, context, meal)
                 return
         except Exception:
@@ -398,9 +609,9 @@ async def callback_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
             name = unquote_cb(quoted_name)
             page = int(page_str)
             if mode == "cuisine":
-                meals = get_meals_by_cuisine(name)
+                meals = await get_meals_by_cuisine(name)
             else:
-                meals = get_meals_by_category(name)
+                meals = await get_meals_by_category(name)
             kb = build_meals_keyboard(meals, mode, name, page)
             title = (f"🌏 <b>{safe(name)}</b> — recipes (Page {page+1})" if mode == "cuisine"
                      else f"🍴 <b>{safe(name)}</b> — recipes (Page {page+1})")
@@ -414,7 +625,7 @@ async def callback_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if data.startswith("meal:"):
         try:
             _, meal_id = data.split(":", 1)
-            meal = get_meal_by_id(meal_id)
+            meal = await get_meal_by_id(meal_id)
             if not meal:
                 await query.answer("⚠️ Failed to load recipe.")
                 return
@@ -424,16 +635,32 @@ async def callback_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
             await query.answer("⚠️ Error loading meal.")
         return
 
-    # save:{id}
+    # favs:{page} -> favorites pagination
+    if data.startswith("favs:"):
+        try:
+            shown = await favorites_page(str(query.message.chat.id), int(data.split(":", 1)[1]))
+            if not shown:
+                await query.edit_message_text("💔 You have no saved recipes yet.")
+                return
+            text, kb = shown
+            await query.edit_message_text(text, reply_markup=kb, parse_mode="HTML")
+        except Exception:
+            logger.exception("favs callback error")
+            await query.answer("⚠️ Could not load favorites.")
+        return
+
+    # save:{id} -> stores name/thumbnail alongside the id so /favorites needs no lookups
     if data.startswith("save:"):
         try:
             _, meal_id = data.split(":", 1)
+            # the meal was just displayed, so this is normally a local mirror hit
+            meal = await get_meal_by_id(meal_id)
             favs = load_favorites()
             user = str(query.message.chat.id)
             if user not in favs:
                 favs[user] = []
-            if meal_id not in favs[user]:
-                favs[user].append(meal_id)
+            if all(fav_id(e) != meal_id for e in favs[user]):
+                favs[user].append(fav_entry(meal) if meal else {"id": meal_id, "name": "", "thumb": ""})
                 save_favorites(favs)
                 await query.answer("💾 Saved to favorites.")
             else:
@@ -447,7 +674,7 @@ async def callback_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if data.startswith("viewsteps:"):
         try:
             _, meal_id = data.split(":",1)
-            meal = get_meal_by_id(meal_id)
+            meal = await get_meal_by_id(meal_id)
             if not meal:
                 await query.answer("⚠️ Cannot fetch recipe steps.")
                 return
@@ -499,7 +726,7 @@ async def callback_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
             session = sessions.get(chat_id)
             if not session or session.get("meal_id") != recipe_key:
                 # session could be missing if restarted, try to rebuild from meal id
-                meal = get_meal_by_id(recipe_key)
+                meal = await get_meal_by_id(recipe_key)
                 if not meal:
                     await query.answer("⚠️ Session expired.")
                     return
@@ -536,7 +763,7 @@ async def callback_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     # random
     if data == "random":
-        meal = random_meal()
+        meal = await random_meal()
         if not meal:
             await query.answer("⚠️ Could not fetch random recipe.")
             return
@@ -555,7 +782,7 @@ async def callback_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 kb = build_items_keyboard(CUISINES, "cuisine", 0)
                 await query.edit_message_text("🌍 <b>Select a Cuisine</b> (Page 1)", reply_markup=kb, parse_mode="HTML")
             else:
-                cats = get_categories()
+                cats = await get_categories()
                 kb = build_items_keyboard(cats, "category", 0)
                 await query.edit_message_text("🍱 <b>Select a Category</b> (Page 1)", reply_markup=kb, parse_mode="HTML")
         except Exception:
@@ -572,18 +799,20 @@ async def text_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not text:
         return
     # treat as search query
-    meals = search_meals_by_name(text)
+    meals = await search_meals_by_name(text)
     if not meals:
         await update.message.reply_text("😔 No recipes found. Try another search.")
         return
-    # show names (build list)
-    names = [m["strMeal"] for m in meals]
-    kb = build_items_keyboard(names, "search", 0)
+    qid, results = search_results.put(text, meals)
+    kb = build_search_keyboard(qid, results, 0)
     await update.message.reply_html(f"🔎 Results for «{safe(text)}» — choose:", reply_markup=kb)    
         
 # ---------------- MAIN ----------------
+async def close_mealdb(app):
+    await mealdb.close()
+
 def main():
-    app = ApplicationBuilder().token(BOT_TOKEN).build()
+    app = ApplicationBuilder().token(BOT_TOKEN).post_shutdown(close_mealdb).build()
 
     # commands
     app.add_handler(CommandHandler("start", start_handler))
@@ -591,12 +820,14 @@ def main():
     app.add_handler(CommandHandler("cuisines", cuisines_handler))
     app.add_handler(CommandHandler("random", random_handler))
     app.add_handler(CommandHandler("search", search_handler))
+    app.add_handler(CommandHandler("ingredients", ingredients_handler))
     app.add_handler(CommandHandler("favorites", favorites_handler))
 
     # callbacks & messages
     app.add_handler(CallbackQueryHandler(callback_handler))
     app.add_handler(MessageHandler(filters.TEXT & (~filters.COMMAND), text_handler))
 
+    mirror.start(MIRROR_REFRESH)
     logger.info("🚀 MealRecipe Bot (python-telegram-bot) is running...")
     app.run_polling()
 
@@ -0,0 +1,213 @@
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+MEALDB_BASE = "https://www.themealdb.com/api/json/v1/1"
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meals (
+    id TEXT PRIMARY KEY, name TEXT, category TEXT, area TEXT, thumb TEXT, data TEXT, synced REAL
+);
+CREATE INDEX IF NOT EXISTS meals_name ON meals (name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS meals_category ON meals (category COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS meals_area ON meals (area COLLATE NOCASE);
+CREATE TABLE IF NOT EXISTS categories (name TEXT PRIMARY KEY);
+CREATE TABLE IF NOT EXISTS areas (name TEXT PRIMARY KEY);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE VIRTUAL TABLE IF NOT EXISTS meals_fts USING fts5(
+    name, instructions, ingredients, tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+
+def ingredients_of(meal):
+    return [meal[f"strIngredient{i}"].strip() for i in range(1, 21)
+            if (meal.get(f"strIngredient{i}") or "").strip()]
+
+
+def split_ingredients(text):
+    # "chicken and garlic", "chicken, garlic & lemon" -> ["chicken", "garlic", "lemon"]
+    return [t.strip() for t in re.split(r",|&|\+|\band\b", text, flags=re.I) if t.strip()]
+
+
+def fts_phrase(term):
+    return '"' + term.replace('"', '""') + '"'
+
+
+def listing(row):
+    # same shape as a filter.php entry
+    return {"strMeal": row[1], "strMealThumb": row[2], "idMeal": row[0]}
+
+
+# Local SQLite copy of the whole MealDB catalogue: categories, areas and every
+# meal's full lookup record, with an FTS5 index over names, instructions and
+# ingredients. refresh() only looks up meals it has not seen yet, so after the
+# first sync a refresh costs one listing call per category.
+class MealMirror:
+    def __init__(self, path="mealdb.sqlite3", base=MEALDB_BASE, get=None, workers=8, timeout=10):
+        if get is None:
+            import requests
+            get = requests.Session().get
+        self.base = base
+        self.get = get
+        self.workers = workers
+        self.timeout = timeout
+        self.path = path
+        self.lock = threading.Lock()  # serialises writers on self.db
+        self.local = threading.local()  # .db = this thread's read connection
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(SCHEMA)
+        self.db.commit()
+        self.count = self.db.execute("SELECT COUNT(*) FROM meals").fetchone()[0]
+        row = self.db.execute("SELECT value FROM meta WHERE key = 'synced'").fetchone()
+        self.synced = float(row[0]) if row else None
+
+    @property
+    def ready(self):
+        # only a completed refresh() makes listings authoritative; single upserts don't
+        return self.synced is not None
+
+    # ----------------- SYNC -----------------
+    def fetch(self, path, **params):
+        r = self.get(f"{self.base}/{path}", params=params, timeout=self.timeout)
+        r.raise_for_status()
+        return r.json()
+
+    def upsert(self, meal, now=None):
+        self.upsert_many([meal], now)
+
+    def upsert_many(self, meals, now=None):
+        # one transaction for the lot
+        now = now or time.time()
+        with self.lock:
+            for meal in meals:
+                mid = meal["idMeal"]
+                self.db.execute("INSERT OR REPLACE INTO meals VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                (mid, meal.get("strMeal"), meal.get("strCategory"), meal.get("strArea"),
+                                 meal.get("strMealThumb"), json.dumps(meal), now))
+                self.db.execute("DELETE FROM meals_fts WHERE rowid = ?", (int(mid),))
+                self.db.execute("INSERT INTO meals_fts (rowid, name, instructions, ingredients) VALUES (?, ?, ?, ?)",
+                                (int(mid), meal.get("strMeal") or "", meal.get("strInstructions") or "",
+                                 "\n".join(ingredients_of(meal))))
+            self.db.commit()
+            self.count = self.db.execute("SELECT COUNT(*) FROM meals").fetchone()[0]
+
+    def lookup(self, mid):
+        meals = self.fetch("lookup.php", i=mid).get("meals")
+        return meals[0] if meals else None
+
+    def refresh(self, full=False):
+        started = time.time()
+        categories = [c["strCategory"] for c in self.fetch("categories.php").get("categories") or []]
+        areas = [a["strArea"] for a in self.fetch("list.php", a="list").get("meals") or []]
+        listed = set()
+        for c in categories:
+            listed.update(m["idMeal"] for m in self.fetch("filter.php", c=c).get("meals") or [])
+
+        with self.lock:
+            known = {r[0] for r in self.db.execute("SELECT id FROM meals")}
+        todo = sorted(listed if full else listed - known)
+        added = 0
+        with ThreadPoolExecutor(self.workers) as pool:
+            for meal in pool.map(self.lookup, todo):
+                if meal:
+                    self.upsert(meal, started)
+                    added += 1
+
+        gone = known - listed if listed else set()
+        with self.lock:
+            self.db.execute("DELETE FROM categories")
+            self.db.executemany("INSERT INTO categories VALUES (?)", [(c,) for c in categories])
+            self.db.execute("DELETE FROM areas")
+            self.db.executemany("INSERT INTO areas VALUES (?)", [(a,) for a in areas])
+            for mid in gone:
+                self.db.execute("DELETE FROM meals WHERE id = ?", (mid,))
+                self.db.execute("DELETE FROM meals_fts WHERE rowid = ?", (int(mid),))
+            self.db.execute("INSERT OR REPLACE INTO meta VALUES ('synced', ?)", (str(started),))
+            self.db.commit()
+            self.count = self.db.execute("SELECT COUNT(*) FROM meals").fetchone()[0]
+            self.synced = started
+        logger.info("MealDB mirror: %d fetched, %d removed, %d total in %.1fs",
+                    added, len(gone), self.count, time.time() - started)
+        return {"added": added, "removed": len(gone), "total": self.count}
+
+    def refresh_loop(self, interval):
+        while True:
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("MealDB mirror refresh failed")
+            time.sleep(interval)
+
+    def start(self, interval=6 * 3600):
+        t = threading.Thread(target=self.refresh_loop, args=(interval,), daemon=True)
+        t.start()
+        return t
+
+    # ----------------- QUERIES -----------------
+    def reader(self):
+        db = getattr(self.local, "db", None)
+        if db is None:
+            db = self.local.db = sqlite3.connect(self.path)
+        return db
+
+    def rows(self, sql, args=()):
+        # each thread reads on its own connection: under WAL it sees the last
+        # commit and never waits on the lock a sync holds while it writes
+        return self.reader().execute(sql, args).fetchall()
+
+    def categories(self):
+        return [r[0] for r in self.rows("SELECT name FROM categories ORDER BY rowid")]
+
+    def areas(self):
+        return [r[0] for r in self.rows("SELECT name FROM areas ORDER BY name")]
+
+    def by_category(self, category):
+        return [listing(r) for r in self.rows(
+            "SELECT id, name, thumb FROM meals WHERE category = ? COLLATE NOCASE ORDER BY name", (category,))]
+
+    def by_area(self, area):
+        return [listing(r) for r in self.rows(
+            "SELECT id, name, thumb FROM meals WHERE area = ? COLLATE NOCASE ORDER BY name", (area,))]
+
+    def meal(self, mid):
+        row = self.rows("SELECT data FROM meals WHERE id = ?", (str(mid),))
+        return json.loads(row[0][0]) if row else None
+
+    def by_name(self, q):
+        # substring match on the name, like search.php?s=
+        pattern = "%" + q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        return [json.loads(r[0]) for r in self.rows(
+            "SELECT data FROM meals WHERE name LIKE ? ESCAPE '\\' ORDER BY name", (pattern,))]
+
+    def random(self):
+        row = self.rows("SELECT data FROM meals ORDER BY RANDOM() LIMIT 1")
+        return json.loads(row[0][0]) if row else None
+
+    def match(self, query, limit=50):
+        try:
+            rows = self.rows("SELECT m.data FROM meals_fts JOIN meals m ON m.id = CAST(meals_fts.rowid AS TEXT) "
+                             "WHERE meals_fts MATCH ? ORDER BY bm25(meals_fts) LIMIT ?", (query, limit))
+        except sqlite3.OperationalError:
+            return []
+        return [json.loads(r[0]) for r in rows]
+
+    def search(self, text, limit=50):
+        # free text over names, instructions and ingredients, best matches first
+        words = re.findall(r"\w+", text)
+        return self.match(" ".join(fts_phrase(w) for w in words), limit) if words else []
+
+    def with_ingredients(self, terms, limit=50):
+        # meals containing every ingredient, e.g. ["chicken", "garlic"]
+        if isinstance(terms, str):
+            terms = split_ingredients(terms)
+        if not terms:
+            return []
+        return self.match(" AND ".join("ingredients : " + fts_phrase(t) for t in terms), limit)
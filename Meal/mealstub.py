@@ -0,0 +1,65 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+MEAL = {"idMeal": "52772", "strMeal": "Teriyaki Chicken Casserole", "strCategory": "Chicken",
+        "strArea": "Japanese", "strMealThumb": "", "strInstructions": "Bake."}
+
+
+def respond(path, params, listing_size):
+    if path.endswith("/categories.php"):
+        return {"categories": [{"strCategory": c} for c in ("Beef", "Chicken", "Dessert", "Pasta", "Seafood")]}
+    if path.endswith("/filter.php"):
+        return {"meals": [{"idMeal": str(52700 + i), "strMeal": f"Meal {i}", "strMealThumb": ""}
+                          for i in range(listing_size)]}
+    if path.endswith("/search.php"):
+        return {"meals": [dict(MEAL, strMeal=f"{params.get('s', '')} {i}") for i in range(5)]}
+    return {"meals": [MEAL]}
+
+
+# Local stand-in for TheMealDB used by the bench_*.py scripts: answers the
+# endpoints the helpers call after a fixed delay and counts requests per path.
+class MealDBStub:
+    def __init__(self, delay=0.02, listing_size=60):
+        self.counts = {}
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                time.sleep(delay)
+                parts = urlsplit(self.path)
+                with stub.lock:
+                    stub.counts[parts.path] = stub.counts.get(parts.path, 0) + 1
+                params = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+                data = json.dumps(respond(parts.path, params, listing_size)).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.request_queue_size = 512
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def total(self):
+        with self.lock:
+            return sum(self.counts.values())
+
+    def start(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -1,34 +1,51 @@
 import requests
 import urllib.parse
 import json
+from mealmirror import MealMirror
 
 MEALDB_BASE = "https://www.themealdb.com/api/json/v1/1"
+mirror = MealMirror("mealdb.sqlite3", MEALDB_BASE)
 
 # ---------------- HELPERS ----------------
+# answered from the local mirror once it has synced
 def get_categories():
+    if mirror.ready:
+        return mirror.categories()
     r = requests.get(f"{MEALDB_BASE}/categories.php").json()
     return [c["strCategory"] for c in r.get("categories", [])]
 
 def get_meals_by_category(category):
+    if mirror.ready:
+        return mirror.by_category(category)
     r = requests.get(f"{MEALDB_BASE}/filter.php?c={urllib.parse.quote_plus(category)}").json()
     return r.get("meals", [])
 
 def get_meals_by_cuisine(cuisine):
+    if mirror.ready:
+        return mirror.by_area(cuisine)
     r = requests.get(f"{MEALDB_BASE}/filter.php?a={urllib.parse.quote_plus(cuisine)}").json()
     return r.get("meals", [])
 
 def get_meal_by_id(meal_id):
+    meal = mirror.meal(meal_id)
+    if meal:
+        return meal
     r = requests.get(f"{MEALDB_BASE}/lookup.php?i={meal_id}").json()
     meals = r.get("meals")
     if meals:
+        mirror.upsert(meals[0])
         return meals[0]
     return None
 
 def search_meals_by_name(name):
+    if mirror.ready:
+        return mirror.by_name(name)
     r = requests.get(f"{MEALDB_BASE}/search.php?s={urllib.parse.quote_plus(name)}").json()
     return r.get("meals", [])
 
 def random_meal():
+    if mirror.ready:
+        return mirror.random()
     r = requests.get(f"{MEALDB_BASE}/random.php").json()
     meals = r.get("meals")
     if meals:
@@ -54,6 +71,7 @@ def print_meal(meal):
 # ---------------- MAIN INTERFACE ----------------
 def main():
     print("=== MealDB Recipe Fetcher ===\n")
+    mirror.start()
     while True:
         print("\nOptions:")
         print("1. List Categories")
@@ -61,7 +79,8 @@ def main():
         print("3. List Meals by Cuisine")
         print("4. Search Meal by Name")
         print("5. Random Meal")
-        print("6. Exit")
+        print("6. Search Meals by Ingredients")
+        print("7. Exit")
         choice = input("Enter option number: ").strip()
         
         if choice == "1":
@@ -114,6 +133,19 @@ def main():
                 print("Could not fetch a random meal.")
         
         elif choice == "6":
+            if not mirror.ready:
+                print("Local recipe index is still syncing, try again shortly.")
+                continue
+            q = input("Enter ingredients (e.g., chicken and garlic): ").strip()
+            meals = mirror.with_ingredients(q)
+            if not meals:
+                print("No meals contain those ingredients.")
+            else:
+                print(f"\nMeals with {q}:")
+                for m in meals:
+                    print(f"- {m['strMeal']} (ID: {m['idMeal']})")
+
+        elif choice == "7":
             print("Goodbye!")
             break
         else: